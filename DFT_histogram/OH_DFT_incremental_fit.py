@@ -0,0 +1,71 @@
+'''update the linear regression model of the OH adsorption energies with the relaxed slabs that were
+added to the training database since the last run. The slabs are streamed from the database into
+the statistics of the training data saved in OH_train_statistics.npz, so the database is never
+held in memory, and the refitted model is saved to OH_incremental_model.json'''
+
+import os
+import sys
+from ase.db import connect
+
+# update system path to be able to import the Slab and LinearRegression classes
+sys.path.append('../model')
+from Slab import Slab
+from LinearRegression import IncrementalRegression
+
+# location and name of database
+db = connect('../DFT_calculations/train.db')
+
+# statistics of the training data added so far
+statsFile = 'OH_train_statistics.npz'
+
+# molecular DFT reference energies (eV)
+refs = {'H2O': -12.261853, 'H2': -6.673272}
+
+# metals in alloy
+metals = ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
+
+def samples(db, firstId, lastId):
+	'''yield the fingerprint and adsorption energy of the relaxed slabs with OH in the database with
+	ids from firstId to lastId, leaving out the slabs omitted by OH_DFT_write_csv.py'''
+	for row in db.select('id>=%d,id<=%d'%(firstId, lastId), relaxed=1, type='OH'):
+
+		# assign atoms of database entry to slab object
+		slab = Slab(db.get_atoms(row.id))
+
+		# omit if slab height has increased more than 10%
+		if slab.distorted(threshold=1.10):
+			print('distorded slab id: %d'%row.slabId)
+			continue
+
+		# omit if OH is more than 0.7 A from an on-top site
+		if not slab.onTop(onTopDist=0.70):
+			print('not on-top slab id: %d'%row.slabId)
+			continue
+
+		# get DFT energy of corresponding slab without OH
+		ESlab = db.get(relaxed=1, type='slab', slabId=row.slabId).energy
+
+		# adsorption energy relative to H2O and H2 (H2O + * -> *OH + 1/2 H2) and the fingerprint
+		# of the on-top adsorption site
+		yield (slab.features(metals, onTop=True, zones=('ens', 's', 'ss')),
+			   row.energy + 0.5*refs['H2'] - ESlab - refs['H2O'])
+
+# continue from the statistics of the previous run
+model = IncrementalRegression(nMetals=5, zoneSizes=(1, 6, 3))
+lastId = 0
+if os.path.exists(statsFile):
+	lastId = int(model.load_statistics(statsFile)['lastId'])
+
+# id of the last database entry, read before streaming so that entries written in the meantime
+# are added by the next run
+newLastId = max([lastId] + [row.id for row in db.select('id>%d'%lastId)])
+
+# stream the new slabs into the statistics
+nAdded = model.add_samples(samples(db, lastId + 1, newLastId))
+model.save_statistics(statsFile, lastId=newLastId)
+print('%d slabs added, %d slabs in total'%(nAdded, model.n))
+
+# refit and save the model
+w = model.fitted_weights()
+print('RMSD of training set: %.3f eV'%model.rmsd(w))
+model.save('OH_incremental_model.json', w, nMetals=5, zoneSizes=(1, 6, 3), metals=metals)
@@ -0,0 +1,87 @@
+'''write the catalytic activity on a grid of compositions over the full simplex of molar fractions
+and over every sub-simplex of 2, 3 and 4 metals, together with the most active composition of
+each subset of metals, to "OH_grid_scan.npz" for plotting'''
+
+import numpy as np
+import sys
+
+# update system path to be able to import the LinearRegression and Activity classes
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+from Activity import Activity
+model = LinearRegression()
+
+# physical constants
+e = 1.602176565e-19 # J/eV
+kB = 1.3806488e-23 # J/K
+
+# absolute temperature (K)
+T = 300
+
+# Boltzmann's constant times temperature (eV)
+kBT = (kB/e)*T
+
+# optimal adsorption energy (eV)
+energyOpt = 1.10
+
+# metals in alloy
+metals = ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
+
+# number of metals
+nMetals = len(metals)
+
+# number of grid intervals between zero and unity molar fraction for each number of metals
+resolutions = {2: 1000, 3: 200, 4: 50, 5: 50}
+
+# number of atoms in zones
+zoneSizes = (1, 6, 3)
+
+# location and name of training set
+csvTrain = '../DFT_histogram/OH_train.csv'
+
+# load training adsorption energies
+XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(15))
+ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals, zoneSizes, metals,
+			  filename='../DFT_histogram/OH_model.json')
+
+# activity as a polynomial in the molar fractions
+activity = Activity.compile(model.fingerprint_blocks(w, nMetals, zoneSizes), energyOpt, kBT)
+
+subsets, subsetResolutions, offsets = [], [], [0]
+numerators, activities = [], []
+best, bestActivities = [], []
+for subsetSize in sorted(resolutions):
+	resolution = resolutions[subsetSize]
+	for metalIds, subNumerators, subActivities in activity.grid_scan(subsetSize, resolution):
+
+		# numerators of the molar fractions of all metals on the grid of the subset
+		gridNumerators = np.zeros((len(subNumerators), nMetals), dtype='uint16')
+		gridNumerators[:, metalIds] = subNumerators
+
+		subsets.append(''.join(metals[m] for m in metalIds))
+		subsetResolutions.append(resolution)
+		offsets.append(offsets[-1] + len(subNumerators))
+		numerators.append(gridNumerators)
+		activities.append(subActivities.astype('float32'))
+
+		# most active composition of the subset
+		i = np.argmax(subActivities)
+		best.append(gridNumerators[i] / float(resolution))
+		bestActivities.append(subActivities[i])
+
+# write the grids of all subsets to a single compressed file. The grid of subset i is given by
+# numerators[offsets[i]:offsets[i+1]] / resolutions[i] with activities[offsets[i]:offsets[i+1]]
+np.savez_compressed('OH_grid_scan.npz', metals=np.array(metals), subsets=np.array(subsets),
+					resolutions=np.array(subsetResolutions), offsets=np.array(offsets),
+					numerators=np.concatenate(numerators), activities=np.concatenate(activities),
+					best=np.array(best), bestActivities=np.array(bestActivities))
+
+# print the most active composition of each subset to terminal
+print('%-12s %8s %8s %8s %8s %8s %10s'%('subset', metals[0], metals[1], metals[2], metals[3],
+										metals[4], 'activity'))
+for subset, f, a in zip(subsets, best, bestActivities):
+	print('%-12s %8.3f %8.3f %8.3f %8.3f %8.3f %10.6f'%(subset, f[0], f[1], f[2], f[3], f[4], a))
@@ -1,11 +1,14 @@
-'''print the alloy composition that maximises the catalytic activity to the terminal'''
+'''print the unique alloy compositions that locally maximise the catalytic activity, and the number
+of random initial compositions converging to each, to the terminal'''
 
-from scipy.optimize import minimize
 import numpy as np
-from random import random
+import sys
 
-# lower and upper bounds on molar fractions
-lower, upper = 0.00, 1.00
+# update system path to be able to import the LinearRegression and Activity classes
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+from Activity import Activity
+model = LinearRegression()
 
 # physical constants
 e = 1.602176565e-19 # J/eV
@@ -26,67 +29,37 @@ metals = ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
 # number of metals
 nMetals = len(metals)
 
-# location and path to csv with all possible fingerprints
-csv = '../pred_histogram/OH_all_slabs.csv'
-
-# load number of each metal, adsorption energies, and multiplicity of fingerprint
-counts = np.loadtxt(csv, delimiter=',', dtype='uint8', usecols=range(nMetals))
-energies = np.loadtxt(csv, delimiter=',', dtype='float', usecols=nMetals)
-mults = np.loadtxt(csv, delimiter=',', dtype='uint16', usecols=nMetals+1)
-
-def activity_neg(f):
-	'''return the negative sum of individual fingerprint activity values
-	f	list 	metallic molar fractions'''
-
-	for fraction in f:
-	
-		# enforce bounds on f by returning large value
-		if fraction < -0.01 or fraction > 1.01:
-			return 1e2
-	
-	# initiate activity to zero	
-	activity = 0
-	
-	# loop through all fingerprints
-	for count, energy, mult in zip(counts, energies, mults):
-
-		# calculate probability factor
-		fProd = 1
-		for f0, n0 in zip(f, count):
-			fProd *= f0**n0
-		
-		# update the activity with the activity of the current fingerprint
-		activity += fProd*mult*np.exp(-abs(energy - energyOpt) / kBT)
-	
-	# return the negative activity	
-	return -activity
-
-# lower and upper bounds on molar fractions
-bnds = ((lower, upper),
-		(lower, upper),
-		(lower, upper),
-		(lower, upper),
-		(lower, upper))
-
-# constrain the sum of the molar fractions to equal unity
-cons = ({'type': 'eq',
-		 'fun' : lambda f: sum(f)-1})
+# number of atoms in zones
+zoneSizes = (1, 6, 3)
+
+# location and name of training set
+csvTrain = '../DFT_histogram/OH_train.csv'
+
+# load training adsorption energies
+XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(15))
+ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals, zoneSizes, metals,
+			  filename='../DFT_histogram/OH_model.json')
+
+# activity as a polynomial in the molar fractions, compiled into a single term for each total
+# count of the metals (1,001 terms instead of 36,750 fingerprints)
+activity = Activity.compile(model.fingerprint_blocks(w, nMetals, zoneSizes), energyOpt, kBT)
+
+# number of random initial compositions and seed of the random number generator
+nStarts = 1000
+seed = 0
+
+# maximise the activity from all initial compositions at once, and group the converged
+# compositions into unique local maxima
+maxima, activities, basins = activity.local_maxima(nStarts, seed)
 
 # print headers
-print('local maxima:')
-print('%8s %8s %8s %8s %8s %10s'%(metals[0], metals[1], metals[2], metals[3], metals[4], 'activity'))
-
-# loop through 25 random initial compositions for the optimizer
-for j in range(25):
-	
-	# generate a random initial composition
-    lst = [random() for _ in range(nMetals)]
-    sumlst = sum(lst)
-    f = [elem/sumlst for elem in lst]
-    
-    # minimize the negative activity (i.e. maximize the activity)
-    res = minimize(activity_neg, f, method='SLSQP', bounds=bnds, constraints=cons, tol=1e-7)
-    
-    # print result to terminal
-    print('%8.3f %8.3f %8.3f %8.3f %8.3f %10.6f'
-    	  %(res.x[0], res.x[1], res.x[2], res.x[3], res.x[4], -activity_neg(res.x)))
\ No newline at end of file
+print('local maxima of %d random initial compositions:' % nStarts)
+print('%8s %8s %8s %8s %8s %10s %8s'%(metals[0], metals[1], metals[2], metals[3], metals[4], 'activity', 'starts'))
+
+# print result to terminal
+for f, a, basin in zip(maxima, activities, basins):
+	print('%8.3f %8.3f %8.3f %8.3f %8.3f %10.6f %8d'%(f[0], f[1], f[2], f[3], f[4], a, basin))
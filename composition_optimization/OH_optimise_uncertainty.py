@@ -0,0 +1,69 @@
+'''print the alloy compositions that locally maximise the catalytic activity averaged over samples
+of the linear regression parameters from their posterior distribution, together with the
+standard deviation of the activity over the samples, to the terminal'''
+
+import numpy as np
+import sys
+
+# update system path to be able to import the LinearRegression and ActivitySamples classes
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+from Activity import ActivitySamples
+model = LinearRegression()
+
+# physical constants
+e = 1.602176565e-19 # J/eV
+kB = 1.3806488e-23 # J/K
+
+# absolute temperature (K)
+T = 300
+
+# Boltzmann's constant times temperature (eV)
+kBT = (kB/e)*T
+
+# optimal adsorption energy (eV)
+energyOpt = 1.10
+
+# metals in alloy
+metals = ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
+
+# number of metals
+nMetals = len(metals)
+
+# number of atoms in zones
+zoneSizes = (1, 6, 3)
+
+# number of samples of the linear regression parameters and seed of the random number generator
+nSamples = 500
+seed = 0
+
+# number of random initial compositions for the optimizer
+nStarts = 1000
+
+# location and name of training set
+csvTrain = '../DFT_histogram/OH_train.csv'
+
+# load training adsorption energies
+XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(15))
+ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+# samples of the linear regression parameters (no. of features x nSamples)
+ws = model.weight_samples(XTrain, ETrain, nMetals, zoneSizes, nSamples, seed)
+
+# activity of each parameter sample, with the predicted energies of all samples computed together
+blocks = model.fingerprint_blocks(ws, nMetals, zoneSizes, blockSize=2**12)
+activities = ActivitySamples.compile(blocks, energyOpt, kBT)
+
+# maximise the activity averaged over the samples
+maxima, meanActivities, basins = activities.mean().local_maxima(nStarts, seed)
+means, stds = activities.mean_and_std(maxima)
+
+# print headers
+print('local maxima of the activity averaged over %d parameter samples:' % nSamples)
+print('%8s %8s %8s %8s %8s %10s %10s %8s'%(metals[0], metals[1], metals[2], metals[3], metals[4],
+										   'activity', 'std', 'starts'))
+
+# print result to terminal
+for f, mean, std, basin in zip(maxima, means, stds, basins):
+	print('%8.3f %8.3f %8.3f %8.3f %8.3f %10.6f %10.6f %8d'
+		  %(f[0], f[1], f[2], f[3], f[4], mean, std, basin))
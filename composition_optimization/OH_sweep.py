@@ -0,0 +1,88 @@
+'''print the most active alloy composition on a grid of compositions for a range of optimal
+adsorption energies and temperatures to the terminal, and write the activities on the grid
+for all settings to "OH_sweep.npz"'''
+
+import numpy as np
+import os
+import sys
+
+# update system path to be able to import the LinearRegression and EnergyHistograms classes
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+from Activity import EnergyHistograms
+from helperMethods import zone_counts
+
+# physical constants
+e = 1.602176565e-19 # J/eV
+kB = 1.3806488e-23 # J/K
+
+# absolute temperatures (K)
+temperatures = np.array([200, 300, 400, 500, 600])
+
+# optimal adsorption energies (eV)
+energyOpts = np.arange(0.90, 1.305, 0.02)
+
+# all combinations of optimal adsorption energy and temperature
+settings = [(energyOpt, T) for T in temperatures for energyOpt in energyOpts]
+settingsEnergyOpt = np.array([setting[0] for setting in settings])
+settingsT = np.array([setting[1] for setting in settings])
+
+# metals in alloy
+metals = ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
+
+# number of metals
+nMetals = len(metals)
+
+# number of grid intervals between zero and unity molar fraction
+resolution = 20
+
+# number of atoms in zones
+zoneSizes = (1, 6, 3)
+
+# location and name of training set
+csvTrain = '../DFT_histogram/OH_train.csv'
+
+# file with the energy histograms of each total count of the metals
+histFilename = 'OH_energy_histograms.npz'
+
+model = LinearRegression()
+
+# load training adsorption energies
+XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(15))
+ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals, zoneSizes, metals,
+			  filename='../DFT_histogram/OH_model.json')
+modelHash = model.model_hash(w, nMetals, zoneSizes)
+
+# load the histograms if they were computed from the predictions of the same model, or compute
+# them from the predicted energies of all fingerprints and save them
+histograms = None
+if os.path.exists(histFilename):
+	histograms = EnergyHistograms.load(histFilename)
+	if histograms.model != modelHash:
+		histograms = None
+if histograms is None:
+	histograms = EnergyHistograms.compile(model.fingerprint_blocks(w, nMetals, zoneSizes),
+										  model=modelHash)
+	histograms.save(histFilename)
+
+# every composition with molar fractions in steps of 1/resolution
+f = zone_counts(nMetals, resolution) / float(resolution)
+
+# activity of each composition for each setting
+activities = histograms.activities(f, settingsEnergyOpt, (kB/e)*settingsT)
+
+np.savez_compressed('OH_sweep.npz', metals=np.array(metals), energyOpts=settingsEnergyOpt,
+					temperatures=settingsT, fractions=f, activities=activities.astype('float32'))
+
+# print the most active composition of each setting to terminal
+print('%8s %8s %8s %8s %8s %8s %8s %10s'%('E_opt', 'T', metals[0], metals[1], metals[2], metals[3],
+										  metals[4], 'activity'))
+for i, (energyOpt, T) in enumerate(settings):
+	best = np.argmax(activities[:, i])
+	print('%8.2f %8d %8.2f %8.2f %8.2f %8.2f %8.2f %10.6f'
+		  %(energyOpt, T, f[best, 0], f[best, 1], f[best, 2], f[best, 3], f[best, 4],
+			activities[best, i]))
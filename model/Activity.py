@@ -0,0 +1,486 @@
+import itertools as it
+import numpy as np
+from helperMethods import zone_counts, project_simplex, Monomials
+
+class Activity(object):
+	'''catalytic activity of alloy compositions, i.e. the sum over fingerprints of the probability
+	of the fingerprint in a random alloy times its multiplicity and exp(-|E - energyOpt|/kBT).
+	This is a polynomial in the molar fractions f with a term coef*prod(f**counts) for each
+	fingerprint (or for each distinct count vector, if compiled), which is evaluated for a batch
+	of compositions at once in log-space'''
+	def __init__(self, counts, coefs, batchSize=2**22):
+		'''counts		array (no. of terms x nMetals)	number of each metal of each term
+		coefs		array (no. of terms)			coefficient of each term
+		batchSize	int								maximum number of (composition, term) pairs
+													to evaluate at a time'''
+		self.counts = np.asarray(counts, dtype='float')
+		self.coefs = np.asarray(coefs, dtype='float')
+		self.batchSize = batchSize
+
+	@classmethod
+	def from_fingerprints(cls, counts, energies, mults, energyOpt, kBT):
+		'''return the activity of the fingerprints given
+		counts		array (no. of fingerprints x nMetals)	number of each metal in fingerprints
+		energies	array (no. of fingerprints)				adsorption energies (eV)
+		mults		array (no. of fingerprints)				multiplicities
+		energyOpt	float									optimal adsorption energy (eV)
+		kBT			float									Boltzmann's constant times temperature (eV)'''
+		energies = np.asarray(energies, dtype='float')
+		coefs = np.asarray(mults, dtype='float')*np.exp(-np.abs(energies - energyOpt) / kBT)
+		return cls(counts, coefs)
+
+	@classmethod
+	def compile(cls, blocks, energyOpt, kBT):
+		'''return the activity of the fingerprints in blocks with the terms of all fingerprints
+		with the same total count of each metal aggregated into a single term, e.g. 1,001 terms
+		for the 36,750 *OH fingerprints. The blocks are streamed once. Raise ValueError if they hold
+		no fingerprints
+		blocks		iterable of tuples	(counts, energies, mults) of the fingerprints, e.g.
+										FingerprintTable.blocks() or
+										LinearRegression.fingerprint_blocks()
+		energyOpt	float				optimal adsorption energy (eV)
+		kBT			float				Boltzmann's constant times temperature (eV)'''
+		coefs = None
+		for counts, energies, mults in blocks:
+			if len(counts) == 0:
+				continue
+
+			if coefs is None:
+				# all count vectors with the number of atoms of the fingerprints
+				monomials = Monomials(counts.shape[1], int(counts[0].sum()))
+				coefs = np.zeros(len(monomials.counts))
+
+			# term id of each fingerprint
+			ids = monomials.ids(counts)
+
+			energies = np.asarray(energies, dtype='float')
+			weights = np.asarray(mults, dtype='float')*np.exp(-np.abs(energies - energyOpt) / kBT)
+			coefs += np.bincount(ids, weights=weights, minlength=len(coefs))
+
+		if coefs is None:
+			raise ValueError('no fingerprints to compile')
+
+		# leave out count vectors without fingerprints
+		keep = coefs > 0
+		return cls(monomials.counts[keep], coefs[keep])
+
+	def save(self, filename):
+		'''save the terms of the activity to a .npz file
+		filename	String		name of file'''
+		np.savez(filename, counts=self.counts, coefs=self.coefs)
+
+	@classmethod
+	def load(cls, filename):
+		'''return the activity saved with save()
+		filename	String		name of file'''
+		data = np.load(filename)
+		return cls(data['counts'], data['coefs'])
+
+	def subset(self, metalIds):
+		'''return the activity of the alloys of only the metals given, with the terms of
+		fingerprints containing any other metal left out
+		metalIds	list of ints	ids (columns) of the metals in the alloys'''
+		metalIds = list(metalIds)
+		others = [m for m in range(self.counts.shape[1]) if m not in metalIds]
+		keep = (self.counts[:, others] == 0).all(axis=1)
+		return Activity(self.counts[keep][:, metalIds], self.coefs[keep], self.batchSize)
+
+	def grid_scan(self, subsetSize, resolution):
+		'''yield the ids of the metals, the grid of molar fractions (numerators of resolution,
+		no. of grid points x subsetSize) and the activities on the grid, for the simplex of each
+		subset of subsetSize metals. Terms of metals outside the subset are skipped entirely
+		subsetSize	int		number of metals in each subset, e.g. 2 for all binary alloys
+		resolution	int		number of grid intervals between zero and unity molar fraction'''
+		nMetals = self.counts.shape[1]
+
+		# every composition with fractions in steps of 1/resolution
+		numerators = zone_counts(subsetSize, resolution)
+
+		for metalIds in it.combinations(range(nMetals), subsetSize):
+			activities = self.subset(metalIds).activity(numerators / float(resolution))
+			yield metalIds, numerators, activities
+
+	def log_fractions(self, f):
+		'''return the logarithm of the molar fractions (batch x nMetals). Fractions of zero (or
+		below) are replaced by the smallest positive float, so that terms without the metal are
+		exact and terms with it vanish
+		f		array (batch x nMetals)		molar fractions'''
+		return np.log(np.maximum(f, np.finfo('float').tiny))
+
+	def sum_terms(self, logF, shift, factors):
+		'''return the sum over terms of coef*factor*prod(f**(counts - shift)) for each composition
+		(batch), skipping terms with a factor of zero
+		logF		array (batch x nMetals)		logarithm of molar fractions
+		shift		array (nMetals)				reduction of the exponents of each metal
+		factors		array (no. of terms)		factor of each term'''
+		keep = factors != 0
+		exponents = self.counts[keep] - shift
+		coefs = self.coefs[keep]*factors[keep]
+
+		# evaluate the compositions in chunks to limit memory use
+		sums = np.zeros(len(logF))
+		chunk = max(1, self.batchSize // max(1, len(coefs)))
+		for start in range(0, len(logF), chunk):
+			terms = np.exp(np.dot(logF[start:start+chunk], exponents.T))
+			sums[start:start+chunk] = np.dot(terms, coefs)
+		return sums
+
+	def activity(self, f):
+		'''return the activity of each composition (batch), or of the single composition given
+		f		array (batch x nMetals) or (nMetals)	molar fractions'''
+		f = np.asarray(f, dtype='float')
+		logF = self.log_fractions(np.atleast_2d(f))
+		nMetals = logF.shape[1]
+
+		activities = self.sum_terms(logF, np.zeros(nMetals), np.ones(len(self.coefs)))
+
+		if f.ndim == 1:
+			return activities[0]
+		return activities
+
+	def gradient(self, f):
+		'''return the exact gradient of the activity with respect to the molar fractions for each
+		composition (batch x nMetals), or for the single composition given (nMetals)
+		f		array (batch x nMetals) or (nMetals)	molar fractions'''
+		f = np.asarray(f, dtype='float')
+		logF = self.log_fractions(np.atleast_2d(f))
+		nMetals = logF.shape[1]
+		unit = np.eye(nMetals)
+
+		# d/df_m prod(f**c) = c_m prod(f**(c - e_m))
+		gradients = np.zeros(logF.shape)
+		for m in range(nMetals):
+			gradients[:, m] = self.sum_terms(logF, unit[m], self.counts[:, m])
+
+		if f.ndim == 1:
+			return gradients[0]
+		return gradients
+
+	def activity_and_gradient(self, f):
+		'''return the activity (batch) and its exact gradient (batch x nMetals) for each
+		composition, or for the single composition given, computed in the same pass over the terms
+		f		array (batch x nMetals) or (nMetals)	molar fractions'''
+		f = np.asarray(f, dtype='float')
+		f2 = np.atleast_2d(f)
+		logF = self.log_fractions(f2)
+		nMetals = logF.shape[1]
+		unit = np.eye(nMetals)
+
+		# fractions below which the gradient is evaluated without dividing by the fraction
+		small = f2 < 1e-8
+
+		activities = np.zeros(len(logF))
+		gradients = np.zeros(logF.shape)
+		chunk = max(1, self.batchSize // max(1, len(self.coefs)))
+		for start in range(0, len(logF), chunk):
+			stop = start + chunk
+
+			# coef*prod(f**c) for each composition and term
+			terms = np.exp(np.dot(logF[start:stop], self.counts.T))*self.coefs
+			activities[start:stop] = terms.sum(axis=1)
+
+			# d/df_m prod(f**c) = c_m prod(f**c) / f_m
+			with np.errstate(divide='ignore', invalid='ignore'):
+				gradients[start:stop] = np.dot(terms, self.counts) / f2[start:stop]
+
+		# d/df_m prod(f**c) = c_m prod(f**(c - e_m)) for fractions close to zero
+		for m in range(nMetals):
+			if small[:, m].any():
+				gradients[small[:, m], m] = self.sum_terms(logF[small[:, m]], unit[m],
+														   self.counts[:, m])
+
+		if f.ndim == 1:
+			return activities[0], gradients[0]
+		return activities, gradients
+
+	def hessian(self, f):
+		'''return the exact Hessian of the activity with respect to the molar fractions for each
+		composition (batch x nMetals x nMetals), or for the single composition given
+		f		array (batch x nMetals) or (nMetals)	molar fractions'''
+		f = np.asarray(f, dtype='float')
+		logF = self.log_fractions(np.atleast_2d(f))
+		nMetals = logF.shape[1]
+		unit = np.eye(nMetals)
+
+		# d^2/df_m df_n prod(f**c) = c_m (c_n - delta_mn) prod(f**(c - e_m - e_n))
+		hessians = np.zeros((len(logF), nMetals, nMetals))
+		for m in range(nMetals):
+			for n in range(m, nMetals):
+				factors = self.counts[:, m]*(self.counts[:, n] - unit[m, n])
+				hessians[:, m, n] = self.sum_terms(logF, unit[m] + unit[n], factors)
+				hessians[:, n, m] = hessians[:, m, n]
+
+		if f.ndim == 1:
+			return hessians[0]
+		return hessians
+
+	def local_maxima(self, nStarts=1000, seed=None, tol=1e-3, xtol=1e-7, maxIter=1000):
+		'''return the unique local maxima of the activity on the simplex of molar fractions
+		(no. of maxima x nMetals), their activities and the number of starts converging to each
+		(basin counts), sorted by decreasing activity. All starts are advanced together by batched
+		projected gradient ascent with spectral (Barzilai-Borwein) step sizes, and the converged
+		compositions are clustered within tol. Starts that have not converged after maxIter
+		iterations are disregarded, so the basin counts may sum to less than nStarts
+		nStarts		int		number of random initial compositions (uniform on the simplex)
+		seed		int		seed of the random initial compositions
+		tol			float	largest difference in any molar fraction of compositions of the same
+							local maximum
+		xtol		float	largest change in any molar fraction of a converged composition
+		maxIter		int		maximum number of iterations'''
+		nMetals = self.counts.shape[1]
+		rng = np.random.RandomState(seed)
+		f = rng.dirichlet(np.ones(nMetals), nStarts)
+
+		activities, gradients = self.activity_and_gradient(f)
+		steps = np.full(nStarts, 0.1)
+		active = np.ones(nStarts, dtype='bool')
+		for _ in range(maxIter):
+			ids = np.nonzero(active)[0]
+			if len(ids) == 0:
+				break
+
+			# step along the gradient and back onto the simplex
+			fNew = project_simplex(f[ids] + steps[ids, np.newaxis]*gradients[ids])
+			activitiesNew, gradientsNew = self.activity_and_gradient(fNew)
+			change = np.abs(fNew - f[ids]).max(axis=1)
+
+			# halve the step of starts that did not improve, and try again
+			improved = activitiesNew > activities[ids]
+			steps[ids[~improved]] *= 0.5
+
+			# accept the improved starts and estimate their next step from the change in gradient
+			acc = ids[improved]
+			df = fNew[improved] - f[acc]
+			dg = gradientsNew[improved] - gradients[acc]
+			curvature = -(df*dg).sum(axis=1)
+			positive = curvature > 0
+			spectral = (df*df).sum(axis=1) / np.where(positive, curvature, 1)
+			steps[acc] = np.clip(np.where(positive, spectral, 2*steps[acc]), 1e-10, 1e3)
+			f[acc] = fNew[improved]
+			activities[acc] = activitiesNew[improved]
+			gradients[acc] = gradientsNew[improved]
+
+			converged = (improved & (change < xtol)) | (steps[ids] < 1e-14)
+			active[ids[converged]] = False
+
+		# leave out the starts that were still moving after maxIter iterations
+		nActive = active.sum()
+		if nActive > 0:
+			print('%d of %d starts did not converge within %d iterations and have been disregarded.'
+				  % (nActive, nStarts, maxIter))
+		f, activities = f[~active], activities[~active]
+		
+		# cluster the converged compositions around the most active ones
+		order = np.argsort(-activities)
+		f, activities = f[order], activities[order]
+		maxima, maxActivities, basins = [], [], []
+		remaining = np.ones(len(f), dtype='bool')
+		while remaining.any():
+			best = np.argmax(remaining)
+			members = remaining & (np.abs(f - f[best]).max(axis=1) < tol)
+			maxima.append(f[best])
+			maxActivities.append(activities[best])
+			basins.append(members.sum())
+			remaining &= ~members
+
+		return np.array(maxima).reshape(-1, nMetals), np.array(maxActivities), np.array(basins)
+
+class EnergyHistograms(object):
+	'''multiplicity-weighted histogram of the adsorption energies of the fingerprints of each total
+	count vector (monomial), stored sparsely as the total multiplicity and the mean energy of
+	the fingerprints in each non-empty (count vector, energy bin) pair. The activity for any
+	optimal adsorption energy and temperature follows without revisiting the fingerprints, with
+	the activity weight of each bin evaluated at its mean energy'''
+	def __init__(self, counts, termIds, mults, energies, binWidth, model=None):
+		'''counts		array (no. of terms x nMetals)	number of each metal of each term
+		termIds		array (no. of bins)				term of each non-empty bin
+		mults		array (no. of bins)				total multiplicity of the fingerprints in bin
+		energies	array (no. of bins)				mean energy of the fingerprints in bin (eV)
+		binWidth	float							width of energy bins (eV)
+		model		String							hash of the model that predicted the energies,
+													as given by LinearRegression.model_hash()'''
+		self.counts = np.asarray(counts, dtype='float')
+		self.termIds = np.asarray(termIds, dtype='int64')
+		self.mults = np.asarray(mults, dtype='float')
+		self.energies = np.asarray(energies, dtype='float')
+		self.binWidth = binWidth
+		self.model = model
+
+	@classmethod
+	def compile(cls, blocks, binWidth=1e-3, bufferSize=2**24, model=None):
+		'''return the energy histograms of the fingerprints in blocks. The blocks are streamed once.
+		Raise ValueError if they hold no fingerprints
+		blocks		iterable of tuples	(counts, energies, mults) of the fingerprints, e.g.
+										FingerprintTable.blocks()
+		binWidth	float				width of energy bins (eV)
+		bufferSize	int					number of binned fingerprints to buffer before merging
+		model		String				hash of the model that predicted the energies, as given
+										by LinearRegression.model_hash()'''
+		monomials = None
+		buffered, nBuffered = [], 0
+		merged = (np.zeros(0, dtype='int64'), np.zeros(0), np.zeros(0))
+		for counts, energies, mults in blocks:
+			if len(counts) == 0:
+				continue
+
+			if monomials is None:
+				monomials = Monomials(counts.shape[1], int(counts[0].sum()))
+
+			# key of the (count vector, energy bin) of each fingerprint
+			energies = np.asarray(energies, dtype='float')
+			bins = np.floor(energies / binWidth).astype('int64') + 2**31
+			keys = monomials.ids(counts)*2**32 + bins
+
+			mults = np.asarray(mults, dtype='float')
+			buffered.append((keys, mults, mults*energies))
+			nBuffered += len(keys)
+
+			# sum the buffered fingerprints of each (count vector, energy bin)
+			if nBuffered > bufferSize:
+				merged = cls.merge([merged] + buffered)
+				buffered, nBuffered = [], 0
+
+		if monomials is None:
+			raise ValueError('no fingerprints to compile')
+
+		keys, mults, moments = cls.merge([merged] + buffered)
+		return cls(monomials.counts, keys // 2**32, mults, moments / mults, binWidth, model)
+
+	@staticmethod
+	def merge(parts):
+		'''return the unique keys of the parts and the sums of their multiplicities and
+		multiplicity-weighted energies
+		parts		list of tuples		(keys, mults, moments) of binned fingerprints'''
+		keys = np.concatenate([part[0] for part in parts])
+		uniqueKeys, ids = np.unique(keys, return_inverse=True)
+		sums = [np.bincount(ids, weights=np.concatenate([part[i] for part in parts]),
+							minlength=len(uniqueKeys)) for i in (1, 2)]
+		return uniqueKeys, sums[0], sums[1]
+
+	def save(self, filename):
+		'''save the histograms and the hash of the model that predicted them to a .npz file
+		filename	String		name of file'''
+		np.savez(filename, counts=self.counts, termIds=self.termIds, mults=self.mults,
+				 energies=self.energies, binWidth=self.binWidth,
+				 model='' if self.model is None else self.model)
+
+	@classmethod
+	def load(cls, filename):
+		'''return the histograms saved with save()
+		filename	String		name of file'''
+		data = np.load(filename)
+		model = str(data['model']) if 'model' in data.files else ''
+		return cls(data['counts'], data['termIds'], data['mults'], data['energies'],
+				   float(data['binWidth']), model or None)
+
+	def coefs(self, energyOpts, kBTs):
+		'''return the activity coefficient of each term (no. of terms x no. of settings) for each
+		setting of optimal adsorption energy and temperature
+		energyOpts	array (no. of settings)		optimal adsorption energies (eV)
+		kBTs		array (no. of settings)		Boltzmann's constant times temperatures (eV)'''
+		energyOpts, kBTs = np.broadcast_arrays(np.atleast_1d(energyOpts), np.atleast_1d(kBTs))
+		coefs = np.zeros((len(self.counts), len(energyOpts)))
+		for i, (energyOpt, kBT) in enumerate(zip(energyOpts, kBTs)):
+			weights = self.mults*np.exp(-np.abs(self.energies - energyOpt) / kBT)
+			coefs[:, i] = np.bincount(self.termIds, weights=weights, minlength=len(self.counts))
+		return coefs
+
+	def activity(self, energyOpt, kBT):
+		'''return the Activity for the optimal adsorption energy and temperature given
+		energyOpt	float	optimal adsorption energy (eV)
+		kBT			float	Boltzmann's constant times temperature (eV)'''
+		coefs = self.coefs(energyOpt, kBT)[:, 0]
+		keep = coefs > 0
+		return Activity(self.counts[keep], coefs[keep])
+
+	def activities(self, f, energyOpts, kBTs, batchSize=2**22):
+		'''return the activity of each composition for each setting of optimal adsorption energy
+		and temperature (batch x no. of settings)
+		f			array (batch x nMetals)		molar fractions
+		energyOpts	array (no. of settings)		optimal adsorption energies (eV)
+		kBTs		array (no. of settings)		Boltzmann's constant times temperatures (eV)
+		batchSize	int							maximum number of (composition, term) pairs
+												to evaluate at a time'''
+		coefs = self.coefs(energyOpts, kBTs)
+		logF = np.log(np.maximum(np.atleast_2d(f), np.finfo('float').tiny))
+
+		# prod(f**c) of each composition and term, contracted with the coefficients of all settings
+		activities = np.zeros((len(logF), coefs.shape[1]))
+		chunk = max(1, batchSize // max(1, len(coefs)))
+		for start in range(0, len(logF), chunk):
+			terms = np.exp(np.dot(logF[start:start+chunk], self.counts.T))
+			activities[start:start+chunk] = np.dot(terms, coefs)
+		return activities
+
+class ActivitySamples(object):
+	'''catalytic activity of alloy compositions for each of a set of samples of the linear
+	regression parameters, e.g. from LinearRegression.weight_samples(). The activity of each
+	sample is a polynomial with the same terms as Activity, so the activities of all samples
+	are evaluated together as a single matrix product with the coefficients of all samples'''
+	def __init__(self, counts, coefs, batchSize=2**22):
+		'''counts		array (no. of terms x nMetals)			number of each metal of each term
+		coefs		array (no. of terms x no. of samples)	coefficient of each term and sample
+		batchSize	int										maximum number of (composition, term)
+															pairs to evaluate at a time'''
+		self.counts = np.asarray(counts, dtype='float')
+		self.coefs = np.asarray(coefs, dtype='float')
+		self.batchSize = batchSize
+
+	@classmethod
+	def compile(cls, blocks, energyOpt, kBT):
+		'''return the activities of the fingerprints in blocks, with the terms of all fingerprints
+		with the same total count of each metal aggregated into a single term. Raise ValueError if
+		the blocks hold no fingerprints
+		blocks		iterable of tuples	(counts, energies, mults) of the fingerprints with
+										energies (no. of fingerprints x no. of samples), e.g.
+										LinearRegression.fingerprint_blocks() with parameters
+										from LinearRegression.weight_samples()
+		energyOpt	float				optimal adsorption energy (eV)
+		kBT			float				Boltzmann's constant times temperature (eV)'''
+		coefs = None
+		for counts, energies, mults in blocks:
+			if len(counts) == 0:
+				continue
+
+			if coefs is None:
+				monomials = Monomials(counts.shape[1], int(counts[0].sum()))
+				coefs = np.zeros((len(monomials.counts), energies.shape[1]))
+
+			# sum the activity weights of the fingerprints of each term, for all samples at once
+			weights = np.asarray(mults, dtype='float')[:, np.newaxis] \
+					  *np.exp(-np.abs(energies - energyOpt) / kBT)
+			ids = monomials.ids(counts)
+			order = np.argsort(ids, kind='mergesort')
+			termIds, starts = np.unique(ids[order], return_index=True)
+			coefs[termIds] += np.add.reduceat(weights[order], starts, axis=0)
+
+		if coefs is None:
+			raise ValueError('no fingerprints to compile')
+
+		# leave out count vectors without fingerprints
+		keep = coefs.sum(axis=1) > 0
+		return cls(monomials.counts[keep], coefs[keep])
+
+	def mean(self):
+		'''return the Activity averaged over the samples, which is itself a polynomial in the molar
+		fractions and can be maximised with Activity.local_maxima()'''
+		return Activity(self.counts, self.coefs.mean(axis=1), self.batchSize)
+
+	def activities(self, f):
+		'''return the activity of each composition for each sample (batch x no. of samples)
+		f		array (batch x nMetals)		molar fractions'''
+		logF = np.log(np.maximum(np.atleast_2d(f), np.finfo('float').tiny))
+
+		activities = np.zeros((len(logF), self.coefs.shape[1]))
+		chunk = max(1, self.batchSize // max(1, len(self.coefs)))
+		for start in range(0, len(logF), chunk):
+			terms = np.exp(np.dot(logF[start:start+chunk], self.counts.T))
+			activities[start:start+chunk] = np.dot(terms, self.coefs)
+		return activities
+
+	def mean_and_std(self, f):
+		'''return the mean and the standard deviation over the samples of the activity of each
+		composition (batch)
+		f		array (batch x nMetals)		molar fractions'''
+		activities = self.activities(f)
+		return activities.mean(axis=1), activities.std(axis=1, ddof=1)
@@ -0,0 +1,78 @@
+import numpy as np
+from helperMethods import Monomials
+
+class FingerprintIndex(object):
+	'''combinatorial index of all fingerprints of the zones given, mapping fingerprints to their
+	row in the tables written by LinearRegression.all_fingerprints() (rank) and rows back to
+	fingerprints (unrank) without searching. The rows are in row-major order of the ensemble ids
+	of the zones, with the ensembles of each zone in the order of zone_counts(), so the row of a
+	fingerprint is a mixed-radix number of its zone ensemble ids'''
+	def __init__(self, nMetals, zoneSizes):
+		'''nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+		self.nMetals = nMetals
+		self.zoneSizes = tuple(zoneSizes)
+
+		# ensembles of each zone and their look-up by the number of each metal
+		self.zones = [Monomials(nMetals, zoneSize) for zoneSize in zoneSizes]
+		self.nZoneEns = tuple(len(zone.counts) for zone in self.zones)
+
+		# number of features in a fingerprint, e.g. 5 + 2*5 = 15
+		self.nFeatures = self.nZoneEns[0] + (len(zoneSizes) - 1)*nMetals
+
+		# number of fingerprints in total and for each adsorption ensemble
+		self.nRows = int(np.prod(self.nZoneEns))
+		self.nPerEns = self.nRows // self.nZoneEns[0]
+
+	def zone_ids(self, features):
+		'''return the ensemble id of each zone (no. of zones x no. of fingerprints) of the
+		fingerprints given. Raise ValueError if any of them is not a fingerprint of the zones
+		features	array (no. of fingerprints x no. of features)	fingerprints as given by
+																	Slab.features()'''
+		features = np.atleast_2d(features)
+		nEns = self.nZoneEns[0]
+		if features.shape[1] != self.nFeatures:
+			raise ValueError('fingerprints have %d features, expected %d'
+							 % (features.shape[1], self.nFeatures))
+
+		# one-hot adsorption ensemble, followed by the number of each metal in the other zones
+		adsFeatures = features[:, :nEns]
+		oneHot = (adsFeatures.sum(axis=1) == 1) & np.all((adsFeatures == 0) | (adsFeatures == 1),
+														axis=1)
+		if not np.all(oneHot):
+			raise ValueError('%s is not a one-hot adsorption ensemble'
+							 % adsFeatures[np.argmin(oneHot)].tolist())
+		ids = [np.argmax(adsFeatures, axis=1)]
+		for z, zone in enumerate(self.zones[1:]):
+			start = nEns + z*self.nMetals
+			ids.append(zone.ids(features[:, start:start+self.nMetals]))
+		return np.array(ids)
+
+	def rank(self, features):
+		'''return the row of each of the fingerprints given. Raise ValueError if any of them is not
+		a fingerprint of the zones
+		features	array (no. of fingerprints x no. of features)	fingerprints as given by
+																	Slab.features()'''
+		return np.ravel_multi_index(tuple(self.zone_ids(features)), self.nZoneEns)
+
+	def unrank(self, rows):
+		'''return the fingerprints (no. of rows x no. of features) of the rows given, as given by
+		Slab.features()
+		rows		array of ints	rows in the fingerprint table'''
+		zoneIds = np.unravel_index(np.asarray(rows, dtype='int64'), self.nZoneEns)
+		features = [np.eye(self.nZoneEns[0], dtype='int64')[zoneIds[0]]]
+		for zone, ids in zip(self.zones[1:], zoneIds[1:]):
+			features.append(zone.counts[ids])
+		return np.concatenate(features, axis=1)
+
+	def counts(self, rows):
+		'''return the total number of each metal (no. of rows x nMetals) of the fingerprints of
+		the rows given, i.e. the counts column of the fingerprint table
+		rows		array of ints	rows in the fingerprint table'''
+		zoneIds = np.unravel_index(np.asarray(rows, dtype='int64'), self.nZoneEns)
+		return sum(zone.counts[ids] for zone, ids in zip(self.zones, zoneIds))
+
+	def ensemble_rows(self, adsEnsId):
+		'''return the first row and the row after the last row of the adsorption ensemble given
+		adsEnsId	int		id of adsorption ensemble'''
+		return adsEnsId*self.nPerEns, (adsEnsId + 1)*self.nPerEns
@@ -0,0 +1,402 @@
+import os
+import json
+import tempfile
+import numpy as np
+from math import factorial
+from FingerprintIndex import FingerprintIndex
+
+# name of the file describing the columns of a fingerprint table
+MANIFEST = 'manifest.json'
+
+# version of the on-disk format
+VERSION = 1
+
+# atomic rename that replaces an existing file on all platforms (os.rename on Python 2)
+_replace = getattr(os, 'replace', os.rename)
+
+def mult_dtype(zoneSizes):
+	'''return the smallest unsigned integer type that holds any fingerprint multiplicity
+	zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+	maxMult = 1
+	for zoneSize in zoneSizes:
+		maxMult *= factorial(zoneSize)
+	if maxMult < 2**32:
+		return 'uint32'
+	return 'uint64'
+
+def read_manifest(path):
+	'''return the manifest (dict) of the fingerprint table in the directory path'''
+	with open(os.path.join(path, MANIFEST)) as f:
+		return json.load(f)
+
+def write_json(fname, data):
+	'''write data to the json file fname, replacing any previous file only once the new one is
+	completely written. The data is written to a temporary file of its own, so processes writing
+	the same file at once do not overwrite each other's partial files'''
+	fd, tmpName = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(fname)), suffix='.tmp')
+	try:
+		with os.fdopen(fd, 'w') as f:
+			json.dump(data, f, indent=1)
+		
+		# give the file the permissions of a file created by open() rather than mkstemp()
+		umask = os.umask(0)
+		os.umask(umask)
+		os.chmod(tmpName, 0o666 & ~umask)
+		_replace(tmpName, fname)
+	except BaseException:
+		os.remove(tmpName)
+		raise
+
+def write_manifest(path, manifest):
+	'''write the manifest (dict) of the fingerprint table in the directory path'''
+	write_json(os.path.join(path, MANIFEST), manifest)
+
+class TableWriter(object):
+	'''write a fingerprint table as raw binary columns in a directory: the number of each metal
+	(uint8), the predicted energy (float32) and the multiplicity (exact unsigned integer) of each
+	fingerprint, together with a json manifest describing the zones, metals and the offsets of
+	the adsorption ensembles in the columns. The manifest is updated after every append, so that
+	an interrupted table can be resumed from the last fingerprints appended'''
+	def __init__(self, path, nMetals, zoneSizes, nZoneEns, metals=None, model=None, shard=None,
+				 resume=False, energyWindow=None):
+		'''path		String			directory to write the table to
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		nZoneEns	list of ints	number of ensembles of each zone, e.g. (5, 210, 35)
+		metals		list of Strings	metal symbols, e.g. ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
+		model		String			hash of the model that predicted the energies
+		shard		dict			'id', 'count', 'start' and 'stop' of the slice of all
+									fingerprints in the table, if it is a shard
+		resume		bool			if True, keep the fingerprints of an existing table in path
+									written by the same model, zones, shard and energy window, and
+									append to it
+		energyWindow tuple of floats (lower, upper) energies of the fingerprints in the table, if
+									the fingerprints outside were left out'''
+
+		if sum(zoneSizes) > np.iinfo('uint8').max:
+			raise ValueError('metal counts of %d atoms do not fit in uint8' % sum(zoneSizes))
+
+		if not os.path.isdir(path):
+			os.makedirs(path)
+
+		self.path = path
+		self.manifest = {'version': VERSION,
+						 'nMetals': int(nMetals),
+						 'metals': list(metals) if metals is not None else None,
+						 'zoneSizes': [int(zoneSize) for zoneSize in zoneSizes],
+						 'nZoneEns': [int(n) for n in nZoneEns],
+						 'model': model,
+						 'shard': shard,
+						 'energyWindow': [float(e) for e in energyWindow] if energyWindow else None,
+						 'nRows': 0,
+						 'columns': {'counts': {'file': 'counts.bin', 'dtype': 'uint8'},
+									 'energies': {'file': 'energies.bin', 'dtype': 'float32'},
+									 'mults': {'file': 'mults.bin', 'dtype': mult_dtype(zoneSizes)}},
+						 'ensembles': [],
+						 'offsets': [0],
+						 'dropped': [],
+						 'complete': False}
+
+		# continue an existing table if it was written with the same definition
+		mode = 'wb'
+		if resume and os.path.exists(os.path.join(path, MANIFEST)):
+			previous = read_manifest(path)
+			keys = ('version', 'nMetals', 'zoneSizes', 'nZoneEns', 'model', 'shard', 'energyWindow',
+					'columns')
+			if all(previous.get(key) == self.manifest[key] for key in keys):
+				self.manifest = previous
+				self.manifest['complete'] = False
+				self.manifest.pop('energyIndex', None)
+				mode = 'r+b'
+
+		# open a file for each column
+		columns = self.manifest['columns']
+		self.files = dict((name, open(os.path.join(path, column['file']), mode))
+						  for name, column in columns.items())
+
+		# discard anything written after the last update of the manifest
+		if mode == 'r+b':
+			for name, f in self.files.items():
+				rowSize = np.dtype(columns[name]['dtype']).itemsize
+				if name == 'counts':
+					rowSize *= nMetals
+				f.truncate(self.manifest['nRows']*rowSize)
+				f.seek(0, os.SEEK_END)
+
+	def append(self, ensId, counts, energies, mults, dropped=0):
+		'''append the fingerprints of an adsorption ensemble to the table, extending the
+		ensemble if it is the same as the ensemble last appended
+		ensId		int							id of adsorption ensemble
+		counts		array (n x nMetals)			number of each metal in the fingerprints
+		energies	array (n)					predicted energies
+		mults		array (n)					multiplicities
+		dropped		int							total multiplicity of the fingerprints of the
+												ensemble left out of the table'''
+		columns = self.manifest['columns']
+		for name, data in (('counts', counts), ('energies', energies), ('mults', mults)):
+			np.ascontiguousarray(data, dtype=columns[name]['dtype']).tofile(self.files[name])
+
+		ensembles, offsets = self.manifest['ensembles'], self.manifest['offsets']
+		if ensembles and ensembles[-1] == ensId:
+			offsets[-1] += len(energies)
+			self.manifest['dropped'][-1] += int(dropped)
+		else:
+			ensembles.append(int(ensId))
+			offsets.append(offsets[-1] + len(energies))
+			self.manifest['dropped'].append(int(dropped))
+		self.manifest['nRows'] = self.manifest['offsets'][-1]
+
+		# checkpoint the fingerprints written so far
+		for f in self.files.values():
+			f.flush()
+		write_manifest(self.path, self.manifest)
+
+	def close(self):
+		'''close the column files and write the manifest of the completed table'''
+		for f in self.files.values():
+			f.close()
+		self.manifest['complete'] = True
+		write_manifest(self.path, self.manifest)
+
+class FingerprintTable(object):
+	'''read-only, memory-mapped fingerprint table as written by TableWriter'''
+	def __init__(self, path):
+		'''path		String		directory containing the table'''
+		self.path = path
+		self.manifest = read_manifest(path)
+
+		self.nMetals = self.manifest['nMetals']
+		self.metals = self.manifest['metals']
+		self.zoneSizes = tuple(self.manifest['zoneSizes'])
+		self.nZoneEns = tuple(self.manifest['nZoneEns'])
+		self.nRows = self.manifest['nRows']
+		self.ensembles = self.manifest['ensembles']
+		self.offsets = self.manifest['offsets']
+
+		# energy window and multiplicity of each ensemble left out of the table
+		self.energyWindow = self.manifest.get('energyWindow')
+		self.dropped = self.manifest.get('dropped', [0]*len(self.ensembles))
+
+		self.counts = self.column('counts', (self.nRows, self.nMetals))
+		self.energies = self.column('energies', (self.nRows, ))
+		self.mults = self.column('mults', (self.nRows, ))
+
+		# energy index, if built with build_energy_index()
+		self.hasEnergyIndex = 'energyIndex' in self.manifest
+		if self.hasEnergyIndex:
+			self.sortedEnergies = self.column('sortedEnergies', (self.nRows, ), 'energyIndex')
+			self.sortedRows = self.column('sortedRows', (self.nRows, ), 'energyIndex')
+			self.cumMults = self.column('cumMults', (self.nRows, ), 'energyIndex')
+
+	def column(self, name, shape, group='columns'):
+		'''return the memory-mapped column given by name in the group of columns of the manifest
+		('columns' or 'energyIndex')'''
+		column = self.manifest[group][name]
+
+		# empty files can not be memory-mapped
+		if self.nRows == 0:
+			return np.zeros(shape, dtype=column['dtype'])
+
+		return np.memmap(os.path.join(self.path, column['file']), dtype=column['dtype'],
+						 mode='r', shape=shape)
+
+	def blocks(self, blockSize=2**20):
+		'''yield views of the counts, energies and multiplicities of at most blockSize fingerprints
+		at a time, in the order of the table
+		blockSize	int		maximum number of fingerprints in each block'''
+		for start in range(0, self.nRows, blockSize):
+			stop = start + blockSize
+			yield self.counts[start:stop], self.energies[start:stop], self.mults[start:stop]
+
+	def ensemble(self, ensId):
+		'''return views of the counts, energies and multiplicities of the fingerprints of the
+		adsorption ensemble given
+		ensId		int		id of adsorption ensemble'''
+		i = self.ensembles.index(ensId)
+		start, stop = self.offsets[i], self.offsets[i+1]
+		return self.counts[start:stop], self.energies[start:stop], self.mults[start:stop]
+
+	def lookup(self, features):
+		'''return the energies and multiplicities of the fingerprints given, looked up by their
+		row in a table of all fingerprints (i.e. not a shard or a table limited to an energy
+		window)
+		features	array (no. of fingerprints x no. of features)	fingerprints as given by
+																	Slab.features()'''
+		index = FingerprintIndex(self.nMetals, self.zoneSizes)
+		if self.nRows != index.nRows:
+			raise ValueError('%s contains %d of the %d fingerprints'
+							 % (self.path, self.nRows, index.nRows))
+		rows = index.rank(features)
+		return self.energies[rows], self.mults[rows]
+
+	def multiplicity_below(self, energies):
+		'''return the total multiplicity of the fingerprints with energies of at most each of the
+		energies given, by binary search in the energy index of each adsorption ensemble
+		energies	array of floats		energies (eV)'''
+		if not self.hasEnergyIndex:
+			raise ValueError('%s has no energy index, see build_energy_index()' % self.path)
+
+		energies = np.asarray(energies, dtype='float32')
+		mults = np.zeros(energies.shape)
+		for start, stop in zip(self.offsets[:-1], self.offsets[1:]):
+
+			# ensembles with no fingerprints in an energy window table have no index entries
+			if stop == start:
+				continue
+			n = np.searchsorted(self.sortedEnergies[start:stop], energies, side='right')
+
+			# cumulative multiplicity of the n lowest energies of the ensemble
+			mults += np.where(n > 0, self.cumMults[start + np.maximum(n, 1) - 1], 0)
+		return mults
+
+	def window(self, lower, upper):
+		'''return the total multiplicity and the rows of the fingerprints with energies in
+		[lower, upper], sorted by energy within each adsorption ensemble
+		lower		float		lowest energy (eV)
+		upper		float		highest energy (eV)'''
+		if not self.hasEnergyIndex:
+			raise ValueError('%s has no energy index, see build_energy_index()' % self.path)
+
+		mult, rows = 0, []
+		for start, stop in zip(self.offsets[:-1], self.offsets[1:]):
+			sortedEnergies = self.sortedEnergies[start:stop]
+			first = start + np.searchsorted(sortedEnergies, np.float32(lower), side='left')
+			last = start + np.searchsorted(sortedEnergies, np.float32(upper), side='right')
+			if last > first:
+				below = int(self.cumMults[first-1]) if first > start else 0
+				mult += int(self.cumMults[last-1]) - below
+				rows.append(self.sortedRows[first:last])
+		rows = np.concatenate(rows) if rows else np.zeros(0, dtype='int64')
+		return mult, rows
+
+	def cdf(self, energies):
+		'''return the fraction of the total multiplicity of the table with energies of at most
+		each of the energies given
+		energies	array of floats		energies (eV)'''
+		return self.multiplicity_below(energies) / self.multiplicity_below(np.inf)
+
+	def quantile(self, q, tol=1e-6):
+		'''return the lowest energy (to within tol) at which the fraction q of the total
+		multiplicity of the table has an energy of at most this energy
+		q			float		fraction of total multiplicity, between 0 and 1
+		tol			float		precision of the energy (eV)'''
+		target = q*self.multiplicity_below(np.inf)
+
+		# bisection between the lowest and highest energy of the table
+		ranges = [(start, stop) for start, stop in zip(self.offsets[:-1], self.offsets[1:])
+				  if stop > start]
+		if not ranges:
+			raise ValueError('%s contains no fingerprints' % self.path)
+		lower = min(float(self.sortedEnergies[start]) for start, stop in ranges) - tol
+		upper = max(float(self.sortedEnergies[stop-1]) for start, stop in ranges)
+		while upper - lower > tol:
+			middle = (lower + upper) / 2
+			if self.multiplicity_below(middle) >= target:
+				upper = middle
+			else:
+				lower = middle
+		return upper
+
+def build_energy_index(path):
+	'''add an energy index to the fingerprint table in the directory path: the energies of each
+	adsorption ensemble sorted in increasing order (float32), the rows of the sorted fingerprints
+	in the table, and their cumulative multiplicity within the ensemble (uint64). Energy windows,
+	cumulative distributions and quantiles of the table are then found by binary search
+	path		String		directory of the fingerprint table'''
+	table = FingerprintTable(path)
+	manifest = table.manifest
+	rowDtype = 'uint32' if table.nRows < 2**32 else 'uint64'
+	index = {'sortedEnergies': {'file': 'sorted_energies.bin', 'dtype': 'float32'},
+			 'sortedRows': {'file': 'sorted_rows.bin', 'dtype': rowDtype},
+			 'cumMults': {'file': 'cum_mults.bin', 'dtype': 'uint64'}}
+	files = dict((name, open(os.path.join(path, column['file']), 'wb'))
+				 for name, column in index.items())
+
+	for start, stop in zip(table.offsets[:-1], table.offsets[1:]):
+		energies = np.asarray(table.energies[start:stop])
+		order = np.argsort(energies, kind='mergesort')
+		mults = np.asarray(table.mults[start:stop]).astype('uint64')[order]
+
+		energies[order].tofile(files['sortedEnergies'])
+		(order + start).astype(rowDtype).tofile(files['sortedRows'])
+		np.cumsum(mults, dtype='uint64').tofile(files['cumMults'])
+
+	for f in files.values():
+		f.close()
+	manifest['energyIndex'] = index
+	write_manifest(path, manifest)
+
+def verify_shards(paths):
+	'''return a list of (path, manifest) of the shard tables in the directories given, sorted by
+	shard id, after checking that they were generated by the same model and zone definition and
+	that they cover all fingerprints exactly once. Raise ValueError otherwise
+	paths		list of Strings		directories of the shard tables'''
+	shards = sorted(((path, read_manifest(path)) for path in paths),
+					key=lambda shard: shard[1]['shard']['id'] if shard[1]['shard'] else -1)
+
+	first = shards[0][1]
+	nFingerprints = 1
+	for n in first['nZoneEns']:
+		nFingerprints *= n
+	stop = 0
+	for path, manifest in shards:
+		if manifest['shard'] is None:
+			raise ValueError('%s is not a shard' % path)
+		if not manifest.get('complete'):
+			raise ValueError('%s is incomplete' % path)
+
+		for key in ('nMetals', 'zoneSizes', 'nZoneEns', 'model'):
+			if manifest[key] != first[key]:
+				raise ValueError('%s differs from %s in %s' % (path, shards[0][0], key))
+
+		shard = manifest['shard']
+		if shard['count'] != len(shards):
+			raise ValueError('%s is one of %d shards, but %d were given'
+							 % (path, shard['count'], len(shards)))
+		if shard['start'] != stop:
+			raise ValueError('fingerprints %d to %d are missing or duplicated at %s'
+							 % (min(stop, shard['start']), max(stop, shard['start']), path))
+		if manifest['nRows'] != shard['stop'] - shard['start']:
+			raise ValueError('%s contains %d of its %d fingerprints'
+							 % (path, manifest['nRows'], shard['stop'] - shard['start']))
+
+		# check that the column files are complete
+		for name, column in manifest['columns'].items():
+			size = os.path.getsize(os.path.join(path, column['file']))
+			nBytes = manifest['nRows']*np.dtype(column['dtype']).itemsize
+			if name == 'counts':
+				nBytes *= manifest['nMetals']
+			if size != nBytes:
+				raise ValueError('%s is %d bytes, expected %d'
+								 % (os.path.join(path, column['file']), size, nBytes))
+		stop = shard['stop']
+
+	if stop != nFingerprints:
+		raise ValueError('fingerprints %d to %d are missing' % (stop, nFingerprints))
+
+	return shards
+
+def merge_shards(paths, path, energyIndex=False):
+	'''concatenate the shard tables in the directories given into a single table, after verifying
+	them with verify_shards()
+	paths		list of Strings		directories of the shard tables
+	path		String				directory to write the merged table to
+	energyIndex	bool				if True, add an energy index with build_energy_index()'''
+	shards = verify_shards(paths)
+	first = shards[0][1]
+	writer = TableWriter(path, first['nMetals'], first['zoneSizes'], first['nZoneEns'],
+						 first['metals'], first['model'])
+
+	for shardPath, manifest in shards:
+		table = FingerprintTable(shardPath)
+
+		# ensembles split between two shards are joined by the writer
+		for i, ensId in enumerate(table.ensembles):
+			start, stop = table.offsets[i], table.offsets[i+1]
+			writer.append(ensId, table.counts[start:stop], table.energies[start:stop],
+						  table.mults[start:stop], table.dropped[i])
+
+	writer.close()
+
+	if energyIndex:
+		build_energy_index(path)
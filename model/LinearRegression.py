@@ -1,7 +1,15 @@
 import itertools as it
+import hashlib
+import json
+import os
 import numpy as np
-from helperMethods import unique, count_metals, remove_zero_columns, multiplicity
+from helperMethods import remove_zero_columns, zone_counts, multiplicities
 from math import factorial
+from FingerprintTable import TableWriter, mult_dtype, write_json, build_energy_index
+from multiprocessing import Pool
+
+# version of the file format written by LinearRegression.save()
+MODEL_VERSION = 1
 
 class LinearRegression():
 	def __init__(self):
@@ -14,6 +22,7 @@ class LinearRegression():
 		t 			array (no. of samples)						target values
 		nMetals 	int											number of metals in alloy
 		zoneSizes	tuple of ints								no. of atoms in each zone'''
+		nFeatures = X.shape[1]
 
 		# remove columns that are pure zeros to avoid singular matrices later
 		X, remIds, self.keepIds = remove_zero_columns(X) # remIds has ids between 1 and 35
@@ -26,7 +35,7 @@ class LinearRegression():
 			print('This features will thus not influence predictions.')
 		elif n > 1:
 			print('features numbered %s were zero for all samples and have been disregarded.'
-				  %remIds.join(', '))
+				  %', '.join(str(i) for i in remIds))
 			print('These features will thus not influence predictions.')
 		
 		# calculate linear regression parameters
@@ -35,168 +44,991 @@ class LinearRegression():
 		b = np.dot(XT, t)
 		w = np.linalg.solve(XTX, b)
 		
-		## center parameters around the average (except first zone)
+		## center parameters around the average (except first zone), which needs the parameters
+		## of all features to group them by zone
+		return self.center_weights(self.full_weights(w, nFeatures), nMetals, zoneSizes)
+
+	def center_weights(self, w, nMetals, zoneSizes):
+		'''return the linear regression parameters with the parameters of each zone (except the
+		first) centered around their average, and the averages moved to the parameters of the
+		adsorption ensembles. Predictions are unchanged, since the number of atoms in each zone
+		is fixed
+		w 			array (no. of features [x no. of samples])	linear regression parameters
+		nMetals 	int											number of metals in alloy
+		zoneSizes	tuple of ints								no. of atoms in each zone'''
+		w = np.array(w, dtype='float')
+		
 		# number of adsorption ensembles
-		nEns = factorial(nMetals+zoneSizes[0]-1) / (factorial(zoneSizes[0]) * factorial(nMetals-1))
+		nEns = factorial(nMetals+zoneSizes[0]-1) // (factorial(zoneSizes[0]) * factorial(nMetals-1))
 		
 		# number of zones except adsorption ensemble zone
-		nGroups = (len(w) - nEns) / nMetals
-		
-		# initiate means of groups
-		groupMeans = [0]*nGroups
+		nGroups = (len(w) - nEns) // nMetals
 		
-		# loop through weights in groups of "nMetals
+		# loop through weights in groups of "nMetals"
 		for g in range(nGroups):
 			start, stop = nEns+g*nMetals, nEns+(g+1)*nMetals
-			ws = w[start:stop]
 			
-			# subtract mean from all parameters
-			mean = sum(ws) / len(ws)
-			ws = [w0 - mean for w0 in ws]
-			groupMeans[g] = mean
+			# subtract mean from all parameters of the group
+			mean = w[start:stop].mean(axis=0)
+			w[start:stop] -= mean
 			
-			# update w
-			w[start:stop] = ws
-			
-		# subtract group means from ensemble parameters
-		for i in range(nEns):
-			for j, mean in enumerate(groupMeans):
-				w[i] += zoneSizes[j+1]*mean
+			# add the group mean to the ensemble parameters
+			w[:nEns] += zoneSizes[g+1]*mean
 		
 		return w
 
-	def predicted_energies(self, X, w):
-		'''return list of predicted energies (size: no. of samples)
-		X (no. of samples x no. of features)	feature array
-		w (no. of features)						linear regression parameters'''
+	def weight_samples(self, X, t, nMetals, zoneSizes, nSamples, seed=None):
+		'''return samples of the linear regression parameters (no. of features x nSamples) from
+		their Gaussian posterior distribution, i.e. with the mean given by weights() and the
+		covariance s^2 (X^T X)^+, where s^2 is the residual variance of the fit. The pseudo-inverse
+		leaves out the directions in which the parameters are undetermined because the number of
+		atoms in each zone is fixed, as these do not change any prediction. The samples are
+		centered like the parameters returned by weights()
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values
+		nMetals 	int											number of metals in alloy
+		zoneSizes	tuple of ints								no. of atoms in each zone
+		nSamples	int											number of parameter samples
+		seed		int											seed of the random samples'''
+		
+		nFeatures = X.shape[1]
+		
+		# remove columns that are pure zeros to avoid singular matrices later
+		X, remIds, self.keepIds = remove_zero_columns(X)
+		
+		# eigenvectors of X^T X in which the parameters are determined by the data
+		eigvals, eigvecs = np.linalg.eigh(np.dot(X.T, X))
+		keep = eigvals > eigvals.max()*len(eigvals)*np.finfo('float').eps
+		eigvals, eigvecs = eigvals[keep], eigvecs[:, keep]
+		
+		# least squares parameters of smallest norm, V D^-1 V^T X^T t, as X^T X is singular
+		w = np.dot(eigvecs, np.dot(eigvecs.T, np.dot(X.T, t)) / eigvals)
+		
+		# residual variance, which needs more samples than determined parameters
+		if len(t) <= len(eigvals):
+			raise ValueError('%d samples do not determine the residual variance of %d parameters'
+							 % (len(t), len(eigvals)))
+		residuals = t - np.dot(X, w)
+		variance = np.dot(residuals, residuals) / (len(t) - len(eigvals))
+		
+		# w + s V D^-1/2 z has covariance s^2 V D^-1 V^T = s^2 (X^T X)^+ for z ~ N(0, 1)
+		z = np.random.RandomState(seed).standard_normal((len(eigvals), nSamples))
+		noise = np.dot(eigvecs, z / np.sqrt(eigvals)[:, np.newaxis])
+		samples = w[:, np.newaxis] + np.sqrt(variance)*noise
+		
+		# center the parameters of all features, so that they are grouped by zone
+		return self.center_weights(self.full_weights(samples, nFeatures), nMetals, zoneSizes)
 
-		# if the number of features is greater than the number of parameters
-		if len(X.T) > len(w):
-			
-			# if only one sample
-			if X.ndim == 1:
+	def bootstrap_weights(self, X, t, nMetals, zoneSizes, nSamples, seed=None):
+		'''return linear regression parameters of all features (no. of features x nSamples) fitted
+		to bootstrap resamples of the training data, centered like the parameters returned by
+		weights(). A resample with counts c of the samples has X^T diag(c) X = sum_i c_i x_i x_i^T,
+		so the normal equations of all resamples are formed with one matrix product of the counts
+		and the outer products of the samples, and solved at once. Features that are zero in a
+		resample get zero parameters before centering, as in weights()
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values
+		nMetals 	int											number of metals in alloy
+		zoneSizes	tuple of ints								no. of atoms in each zone
+		nSamples	int											number of bootstrap resamples
+		seed		int											seed of the resamples'''
+		X = np.asarray(X, dtype='float')
+		t = np.asarray(t, dtype='float')
+		n, nFeatures = X.shape
+		self.keepIds = list(range(nFeatures))
+		
+		# number of times each sample is drawn in each resample (nSamples x no. of samples)
+		counts = np.random.RandomState(seed).multinomial(n, np.ones(n)/n, size=nSamples)
+		
+		# X^T diag(c) X and X^T diag(c) t of all resamples
+		outer = (X[:, :, np.newaxis]*X[:, np.newaxis, :]).reshape(n, -1)
+		XTX = np.dot(counts, outer).reshape(nSamples, nFeatures, nFeatures)
+		XTt = np.dot(counts, X*t[:, np.newaxis])
+		
+		# least squares parameters of smallest norm, since the parameters are only determined up
+		# to the fixed number of atoms in each zone, which the centering fixes
+		XTXInv = np.linalg.pinv(XTX, rcond=nFeatures*np.finfo('float').eps)
+		w = np.einsum('bij,bj->ib', XTXInv, XTt)
+		
+		## center parameters around the average (except first zone)
+		return self.center_weights(w, nMetals, zoneSizes)
 
-				# keep only columns that have defined parameters
-				X = X[self.keepIds]
-			else:
+	def cross_validation(self, X, t, nFolds=None, seed=None, featureIds=None):
+		'''return the cross-validation residuals (size: no. of samples), i.e. the target values
+		minus the predictions of the model fitted without the fold of each sample, together with
+		their root mean square and mean absolute values. The residuals follow exactly from a single
+		factorisation of X instead of a refit for each fold: with the hat matrix
+		H = X (X^T X)^+ X^T and the residuals r of the fit to all samples, the residuals of a fold
+		F are (I - H_FF)^-1 r_F, i.e. r_i / (1 - H_ii) for leave-one-out. The residuals of a fold
+		holding all the samples in which a feature is nonzero are undetermined, so they are nan
+		and left out of the root mean square and mean absolute values
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values
+		nFolds		int											number of random folds
+																(default: leave-one-out)
+		seed		int											seed of the random folds
+		featureIds	list of ints								features to fit with
+																(default: all)'''
+		X = np.asarray(X, dtype='float')
+		t = np.asarray(t, dtype='float')
+		if featureIds is not None:
+			X = X[:, featureIds]
+		
+		# orthonormal basis U of the column space of X, for which H = U U^T
+		U, s, VT = np.linalg.svd(X, full_matrices=False)
+		U = U[:, s > s.max()*max(X.shape)*np.finfo('float').eps]
+		
+		# residuals of the fit to all samples
+		r = t - np.dot(U, np.dot(U.T, t))
+		
+		# eigenvalues of I - H_FF below this leave a direction of the fold undetermined
+		tol = 1e-8
+		
+		if nFolds is None:
+			# leave-one-out, with 1 - H_ii for each sample
+			factors = 1. - (U**2).sum(axis=1)
+			residuals = np.full(len(t), np.nan)
+			determined = factors > tol
+			residuals[determined] = r[determined] / factors[determined]
+		else:
+			folds = np.array_split(np.random.RandomState(seed).permutation(len(t)), nFolds)
+			residuals = np.empty(len(t))
+			for fold in folds:
+				
+				# solve (I - H_FF) x = r_F from the eigenvalues of the symmetric I - H_FF
+				UF = U[fold]
+				eigvals, eigvecs = np.linalg.eigh(np.eye(len(fold)) - np.dot(UF, UF.T))
+				if eigvals.min() > tol:
+					residuals[fold] = np.dot(eigvecs, np.dot(eigvecs.T, r[fold]) / eigvals)
+				else:
+					residuals[fold] = np.nan
+		
+		determined = residuals[np.isfinite(residuals)]
+		return residuals, np.sqrt(np.mean(determined**2)), np.mean(np.abs(determined))
 
-				# keep only columns that have defined parameters
-				X = X[:, self.keepIds]
+	def ridge_path(self, X, t, nMetals, zoneSizes, penalties):
+		'''return the ridge regression parameters of all features (no. of features x no. of
+		penalties), minimizing |X w - t|^2 + penalty |w|^2 for each penalty, together with the
+		leave-one-out and generalized cross-validation (GCV) root mean square errors of each
+		penalty (size: no. of penalties). All follow from a single singular value decomposition
+		X = U S V^T: w = V S / (S^2 + penalty) U^T t, and the hat matrix is
+		U S^2 / (S^2 + penalty) U^T. Without a penalty, the leave-one-out error is infinite if a
+		sample is the only one in which a feature is nonzero. A penalty of zero gives the
+		parameters of weights(), and the parameters are centered like those of weights()
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values
+		nMetals 	int											number of metals in alloy
+		zoneSizes	tuple of ints								no. of atoms in each zone
+		penalties	list of floats								ridge penalties (eV^2 per
+																parameter^2)'''
+		X = np.asarray(X, dtype='float')
+		t = np.asarray(t, dtype='float')
+		penalties = np.asarray(penalties, dtype='float')
+		n = len(t)
+		
+		# all features have parameters, as the penalty determines those of zero features
+		self.keepIds = list(range(X.shape[1]))
+		
+		# singular values and vectors in which the parameters are determined by the data
+		U, s, VT = np.linalg.svd(X, full_matrices=False)
+		keep = s > s.max()*max(X.shape)*np.finfo('float').eps
+		U, s, VT = U[:, keep], s[keep], VT[keep]
+		
+		# shrinkage factors S^2 / (S^2 + penalty) (rank x no. of penalties)
+		shrink = s[:, np.newaxis]**2 / (s[:, np.newaxis]**2 + penalties)
+		
+		# parameters of all penalties at once
+		Ut = np.dot(U.T, t)
+		w = np.dot(VT.T, shrink / s[:, np.newaxis] * Ut[:, np.newaxis])
+		
+		# residuals and leverages H_ii of each penalty (no. of samples x no. of penalties)
+		residuals = t[:, np.newaxis] - np.dot(U, shrink * Ut[:, np.newaxis])
+		leverages = np.dot(U**2, shrink)
+		
+		# leave-one-out residuals r_i / (1 - H_ii), and GCV with the mean leverage tr(H) / n
+		with np.errstate(divide='ignore', invalid='ignore'):
+			looRMSE = np.sqrt(np.mean((residuals / (1. - leverages))**2, axis=0))
+			gcvRMSE = np.sqrt(np.mean(residuals**2, axis=0)) / (1. - shrink.sum(axis=0)/n)
+		
+		## center parameters around the average (except first zone)
+		return self.center_weights(w, nMetals, zoneSizes), looRMSE, gcvRMSE
+
+	def predicted_energies(self, X, w):
+		'''return list of predicted energies (size: no. of samples [x no. of parameter sets]),
+		with the predictions of all parameter sets in a single matrix product
+		X (no. of samples x no. of features)			feature array
+		w (no. of features [x no. of parameter sets])	linear regression parameters, e.g. from
+														weight_samples() or bootstrap_weights()'''
+
+		# if the number of features is greater than the number of parameters, expand the
+		# parameters with zeros for the disregarded features instead of copying the kept columns
+		if X.shape[-1] > len(w):
+			w = self.full_weights(w, X.shape[-1])
 		
 		# return predicted energies
 		return np.dot(X, w)
 
-	def all_fingerprints(self, filename, w, nMetals, zoneSizes):
-		'''write a csv file containing the number of each metal,
-		the adsorption energy, and the multiplicity of all fingerprints.
-		filename	String			name of csv file to save the output to
+	def row_energies(self, w, nMetals, zoneSizes, rows):
+		'''return the predicted energies of the fingerprints in the rows given of the tables written
+		by all_fingerprints(), summed from the zone tables without forming the fingerprints
 		w			list of floats	linear regression parameters
 		nMetals		int				number of metals in the alloy, e.g. 5
-		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		rows		array of ints	rows in the fingerprint table'''
+		tables = self.zone_tables(w, nMetals, zoneSizes)
+		nZoneEns = [len(table[0]) for table in tables]
+		zoneIds = np.unravel_index(np.asarray(rows, dtype='int64'), nZoneEns)
+		return sum(table[1][ids] for table, ids in zip(tables, zoneIds))
+
+	def full_weights(self, w, nFeatures):
+		'''return the linear regression parameters expanded to all features, with zeros for
+		the features that were disregarded when fitting
+		w			list of floats	linear regression parameters
+		nFeatures	int				number of features in a fingerprint'''
+		w = np.asarray(w, dtype='float')
 		
-		# ensembles within each zone 
-		# e.g. [ [(0, ), (1, ), ...],
-		#		 [(0, 0, 0, 0, 0, 0), (0, 0, 0, 0, 0, 1), ...], 
-		#		 ... ]
-		allZoneEns = [list(it.combinations_with_replacement(range(nMetals), zoneSize)) for zoneSize in zoneSizes]
+		# parameters are already defined for all features
+		if len(w) == nFeatures:
+			return w
 		
-		# transform ensembles into counts of metals within each zone
+		wFull = np.zeros((nFeatures, ) + w.shape[1:])
+		wFull[self.keepIds] = w
+		return wFull
+
+	def zone_tables(self, w, nMetals, zoneSizes):
+		'''return a list with a tuple (counts, energies, mults) for each zone, where counts
+		(no. of zone ensembles x nMetals) is the number of each metal in the zone ensembles,
+		energies (no. of zone ensembles) is their contribution to the adsorption energy, and
+		mults (no. of zone ensembles) is their multiplicity
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+		
+		# metal counts of the ensembles within each zone
 		# e.g. [ [[1, 0, 0, 0, 0], [0, 1, 0, 0, 0], ...],
 		#		 [[6, 0, 0, 0, 0], [5, 1, 0, 0, 0], ...], 
 		#		 ...]
-		zoneCounts = [[count_metals(ens, nMetals) for ens in zoneEnss] for zoneEnss in allZoneEns]
+		allZoneCounts = [zone_counts(nMetals, zoneSize) for zoneSize in zoneSizes]
+		
+		# number of features in a fingerprint, e.g. 5 + 2*5 = 15
+		nFeatures = len(allZoneCounts[0]) + (len(zoneSizes) - 1)*nMetals
+		w = self.full_weights(w, nFeatures)
+		
+		tables = []
+		start = 0
+		for zoneId, (zoneSize, zoneCounts) in enumerate(zip(zoneSizes, allZoneCounts)):
+			
+			if zoneId == 0:
+				# adsorption ensembles have a parameter each
+				stop = start + len(zoneCounts)
+				energies = w[start:stop]
+			else:
+				# remaining zones have a parameter for each metal
+				stop = start + nMetals
+				energies = np.dot(zoneCounts, w[start:stop])
+			
+			tables.append((zoneCounts, energies, multiplicities(zoneSize, zoneCounts)))
+			start = stop
+		
+		return tables
+
+	def ensemble_fingerprints(self, adsEnsId, tables):
+		'''return the counts of each metal (no. of fingerprints x nMetals), the predicted energies
+		and the multiplicities of all fingerprints with the adsorption ensemble given, in the
+		same order as itertools.product over the remaining zone ensembles
+		adsEnsId	int				id of adsorption ensemble
+		tables		list of tuples	zone tables as returned by zone_tables()'''
+		
+		adsCounts, adsEnergies, adsMults = tables[0]
+		counts, energies, mults = adsCounts[adsEnsId], adsEnergies[adsEnsId], adsMults[adsEnsId]
+		
+		# add a dimension for each remaining zone, since the model is additive in the zones
+		for zoneCounts, zoneEnergies, zoneMults in tables[1:]:
+			counts = counts[..., np.newaxis, :] + zoneCounts
+			energies = np.add.outer(energies, zoneEnergies)
+			mults = np.multiply.outer(mults, zoneMults)
+		
+		return counts.reshape(-1, counts.shape[-1]), energies.ravel(), mults.ravel()
+
+	def fingerprint_blocks(self, w, nMetals, zoneSizes, blockSize=2**20, start=0, stop=None):
+		'''yield blocks of (counts, energies, mults) of at most blockSize fingerprints each, in the
+		same order as the rows written by all_fingerprints(), without storing more than one block
+		in memory at a time
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		blockSize	int				maximum number of fingerprints in each block
+		start		int				index of the first fingerprint to yield
+		stop		int				index after the last fingerprint to yield (default: all)'''
+		
+		# counts, energy contributions and multiplicities of the ensembles in each zone
+		tables = self.zone_tables(w, nMetals, zoneSizes)
+		nZoneEns = [len(table[0]) for table in tables]
+		
+		if stop is None:
+			stop = int(np.prod(nZoneEns))
+		
+		for blockStart in range(start, stop, blockSize):
+			
+			# ensemble id of each zone for the fingerprints in the block
+			ids = np.arange(blockStart, min(blockStart + blockSize, stop))
+			zoneIds = np.unravel_index(ids, nZoneEns)
+			
+			# sum the zone contributions
+			counts = np.zeros((len(ids), nMetals), dtype='int64')
+			energies = np.zeros((len(ids), ) + tables[0][1].shape[1:])
+			mults = np.ones(len(ids), dtype='int64')
+			for (zoneCounts, zoneEnergies, zoneMults), zoneId in zip(tables, zoneIds):
+				counts += zoneCounts[zoneId]
+				energies += zoneEnergies[zoneId]
+				mults *= zoneMults[zoneId]
+			
+			yield counts, energies, mults
+
+	def model_hash(self, w, nMetals, zoneSizes):
+		'''return a hash (String) of the linear regression parameters and the zone definition,
+		identifying the model that predicted a set of fingerprint energies
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+		w = self.full_weights(w, self.n_features(nMetals, zoneSizes))
+		
+		sha = hashlib.sha1()
+		sha.update(np.ascontiguousarray(w, dtype='float64').tobytes())
+		sha.update(repr((int(nMetals), tuple(int(zoneSize) for zoneSize in zoneSizes))).encode())
+		return sha.hexdigest()
+
+	def n_features(self, nMetals, zoneSizes):
+		'''return the number of features in a fingerprint, e.g. 5 + 2*5 = 15
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+		return len(zone_counts(nMetals, zoneSizes[0])) + (len(zoneSizes) - 1)*nMetals
+
+	def training_hash(self, X, t):
+		'''return a hash (String) of the training data, identifying the data a model was fitted to
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values'''
+		sha = hashlib.sha1()
+		sha.update(repr(np.shape(X)).encode())
+		sha.update(np.ascontiguousarray(X, dtype='int64').tobytes())
+		sha.update(np.ascontiguousarray(t, dtype='float64').tobytes())
+		return sha.hexdigest()
+
+	def save(self, filename, w, nMetals, zoneSizes, metals=None, trainingHash=None):
+		'''save a fitted model to the json file filename, with the linear regression parameters
+		expanded to all features
+		w				list of floats	linear regression parameters
+		nMetals			int				number of metals in the alloy, e.g. 5
+		zoneSizes		list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		metals			list of Strings	names of the metals, e.g. ('Ir', 'Pd', ...)
+		trainingHash	String			hash of the training data, as given by training_hash()'''
+		w = self.full_weights(w, self.n_features(nMetals, zoneSizes))
+		write_json(filename, {'version': MODEL_VERSION,
+							  'nMetals': int(nMetals),
+							  'metals': None if metals is None else list(metals),
+							  'zoneSizes': [int(zoneSize) for zoneSize in zoneSizes],
+							  'weights': [float(wi) for wi in w],
+							  'keepIds': [int(i) for i in self.keepIds],
+							  'trainingHash': trainingHash,
+							  'model': self.model_hash(w, nMetals, zoneSizes)})
+
+	def load(self, filename):
+		'''load a model saved by save(), setting keepIds, nMetals, metals, zoneSizes and
+		trainingHash of this instance, and return its linear regression parameters of all features.
+		Raise ValueError if the file does not hold a valid model
+		filename	String	name of the json file of the model'''
+		with open(filename) as f:
+			data = json.load(f)
+		
+		if data.get('version') != MODEL_VERSION:
+			raise ValueError('%s has model version %s, expected %d'
+							 % (filename, data.get('version'), MODEL_VERSION))
+		
+		w = np.array(data['weights'], dtype='float')
+		if self.model_hash(w, data['nMetals'], data['zoneSizes']) != data['model']:
+			raise ValueError('the parameters in %s do not match its model hash' % filename)
+		
+		self.keepIds = data['keepIds']
+		self.nMetals = data['nMetals']
+		self.metals = data['metals']
+		self.zoneSizes = tuple(data['zoneSizes'])
+		self.trainingHash = data['trainingHash']
+		return w
+
+	def fit(self, X, t, nMetals, zoneSizes, metals=None, filename=None):
+		'''return the linear regression parameters of all features, loaded from filename if it holds
+		a model fitted to the same training data and zones, or fitted with weights() and saved to
+		filename otherwise
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values
+		nMetals 	int											number of metals in alloy
+		zoneSizes	tuple of ints								no. of atoms in each zone
+		metals		list of Strings								names of the metals
+		filename	String										json file of the cached model'''
+		trainingHash = self.training_hash(X, t)
+		
+		# reuse the cached model if it was fitted to the same data
+		if filename is not None and os.path.exists(filename):
+			try:
+				w = self.load(filename)
+				if (self.trainingHash == trainingHash and self.nMetals == nMetals
+					and self.zoneSizes == tuple(zoneSizes)):
+					return w
+			except (ValueError, KeyError):
+				pass
+		
+		w = self.weights(X, t, nMetals, zoneSizes)
+		w = self.full_weights(w, self.n_features(nMetals, zoneSizes))
+		self.nMetals, self.metals, self.zoneSizes = nMetals, metals, tuple(zoneSizes)
+		self.trainingHash = trainingHash
+		if filename is not None:
+			self.save(filename, w, nMetals, zoneSizes, metals, trainingHash)
+		return w
+
+	def shard_fingerprints(self, filename, w, nMetals, zoneSizes, shardId, nShards, metals=None,
+						   blockSize=2**20, resume=False):
+		'''write a fingerprint table with only the shard shardId of nShards contiguous, equally
+		sized slices of all fingerprints. The shard tables are self-describing and are verified and
+		joined with merge_shards() in FingerprintTable.py
+		filename	String			name of table directory to save the shard to
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		shardId		int				id of shard {0...nShards-1}
+		nShards		int				total number of shards
+		metals		list of Strings	metal symbols to store in the table manifest
+		blockSize	int				maximum number of fingerprints to hold in memory
+		resume		bool			if True, continue an interrupted shard from its last block'''
+		
+		# number of ensembles of each zone, e.g. [5, 210, 35]
+		nZoneEns = [len(zone_counts(nMetals, zoneSize)) for zoneSize in zoneSizes]
+		
+		# number of fingerprints in total and for each adsorption ensemble
+		nFingerprints = 1
+		for n in nZoneEns:
+			nFingerprints *= n
+		nPerEns = nFingerprints // nZoneEns[0]
+		
+		# slice of fingerprints in this shard
+		start = nFingerprints*shardId // nShards
+		stop = nFingerprints*(shardId + 1) // nShards
+		
+		shard = {'id': shardId, 'count': nShards, 'start': start, 'stop': stop}
+		writer = TableWriter(filename, nMetals, zoneSizes, nZoneEns, metals,
+							 self.model_hash(w, nMetals, zoneSizes), shard, resume)
+		
+		# skip the fingerprints already written by an interrupted run
+		start += writer.manifest['nRows']
+		
+		# loop through the adsorption ensembles overlapping the (remaining) shard
+		for adsEnsId in range(start // nPerEns, -(-stop // nPerEns)):
+			ensStart, ensStop = max(start, adsEnsId*nPerEns), min(stop, (adsEnsId + 1)*nPerEns)
+			for block in self.fingerprint_blocks(w, nMetals, zoneSizes, blockSize, ensStart, ensStop):
+				writer.append(adsEnsId, *block)
+		
+		writer.close()
+
+	def all_fingerprints(self, filename, w, nMetals, zoneSizes, metals=None, csv=False, nProcs=1,
+						 resume=False, energyWindow=None, energyIndex=False):
+		'''write a fingerprint table (or csv file) containing the number of each metal,
+		the adsorption energy, and the multiplicity of all fingerprints (or of the fingerprints with
+		energies within energyWindow), and return the total multiplicity of the fingerprints left out.
+		filename	String			name of table directory (or csv file) to save the output to
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		metals		list of Strings	metal symbols to store in the table manifest
+		csv			bool			if True, write csv files with np.savetxt instead of a table
+		nProcs		int				number of processes to distribute the adsorption ensembles over.
+									The output is identical to the output of a single process
+		resume		bool			if True, keep the adsorption ensembles already saved by an
+									interrupted run with the same parameters and zones, and only
+									generate the missing ones (for tables and csv files saved
+									for each adsorption ensemble)
+		energyWindow tuple of floats (lower, upper) energies of the fingerprints to save, e.g.
+									activity_window() for a minimum activity weight (default: all)
+		energyIndex	bool			if True, add an energy index to the table for energy window,
+									distribution and quantile queries (see build_energy_index() in
+									FingerprintTable.py)'''
+		
+		# counts, energy contributions and multiplicities of the ensembles in each zone
+		tables = self.zone_tables(w, nMetals, zoneSizes)
 		
 		# number of ensembles of each zone
 		# e.g. [5, 210, 35]
-		nZoneEns = [len(zoneEnss) for zoneEnss in allZoneEns]
+		nZoneEns = [len(table[0]) for table in tables]
 		
 		# number of lines of csv file
 		# e.g. 36,750
 		nLines = np.prod(nZoneEns)
 		
 		# if lots of fingerprints are saved then save each adsorption ensemble as individual files
-		saveEns = False
-		if nLines > 1e6:
-			saveEns = True
-			
-			# redefine number of lines per file
-			nLines = nLines//nZoneEns[0]
+		# and report progress
+		saveEns = nLines > 1e6
 		
-		# initiate arrays
-		counts = np.zeros((nLines, nMetals))
-		energies = np.zeros(nLines)
-		mults = np.zeros(nLines)
+		fmt = ['%d']*nMetals + ['%.5f'] + ['%d']
+		modelHash = self.model_hash(w, nMetals, zoneSizes)
+		
+		if energyWindow is not None:
+			energyWindow = [float(energy) for energy in energyWindow]
+		
+		# adsorption ensembles saved by an interrupted run and the multiplicity left out of them
+		done = []
+		dropped = []
+		if not csv:
+			writer = TableWriter(filename, nMetals, zoneSizes, nZoneEns, metals, modelHash,
+								 resume=resume, energyWindow=energyWindow)
+			done = list(writer.manifest['ensembles'])
+			dropped = list(writer.manifest['dropped'])
+		elif saveEns:
+			
+			# checkpoint of the csv files of each adsorption ensemble
+			parts = filename.rpartition('.')
+			checkpoint = parts[0] + '_checkpoint.json'
+			if resume and os.path.exists(checkpoint):
+				with open(checkpoint) as f:
+					previous = json.load(f)
+				if previous['model'] == modelHash and previous.get('energyWindow') == energyWindow:
+					done, dropped = previous['ensembles'], previous['dropped']
 		
-		# initiate counter
-		i = 0
+		# one task for each adsorption ensemble of the form (adsEnsId, fname, dtypes, energyWindow),
+		# where fname is the csv file the worker saves the ensemble to (None to return the
+		# fingerprints) and dtypes are the data types to return the fingerprints as
+		tasks = []
+		for adsEnsId in range(nZoneEns[0]):
+			if adsEnsId in done:
+				print('ensemble %d already saved'%adsEnsId)
+			elif csv and saveEns:
+				
+				# add an underscored number of the current ensemble in the filename
+				fname = parts[0] + '_%d'%adsEnsId + parts[1] + parts[2]
+				tasks.append((adsEnsId, fname, fmt, energyWindow))
+			elif csv:
+				tasks.append((adsEnsId, None, ('int64', 'float', 'int64'), energyWindow))
+			else:
+				dtypes = ('uint8', 'float32', mult_dtype(zoneSizes))
+				tasks.append((adsEnsId, None, dtypes, energyWindow))
 		
-		# loop through all adsorption site ensembles
-		for adsEnsId, adsEns in enumerate(allZoneEns[0]):
+		pool = None
+		if nProcs > 1:
+			pool = Pool(nProcs, _init_worker, (tables, ))
 			
-			if saveEns:
+			# ensembles saved by the workers are reported as they complete, while returned
+			# fingerprints are received in order to be written deterministically
+			if csv and saveEns:
+				results = pool.imap_unordered(_ensemble_worker, tasks)
+			else:
+				results = pool.imap(_ensemble_worker, tasks)
+		else:
+			_init_worker(tables)
+			results = (_ensemble_worker(task) for task in tasks)
+		
+		outputs = []
+		
+		try:
+			# loop through all adsorption site ensembles
+			for adsEnsId, fingerprints, ensDropped in results:
+				done.append(adsEnsId)
+				dropped.append(ensDropped)
 				
-				# reset arrays
-				counts = np.zeros((nLines, nMetals), dtype='int64')
-				energies = np.zeros(nLines, dtype='float')
-				mults = np.zeros(nLines, dtype='int64')
+				if not csv:
+					writer.append(adsEnsId, *fingerprints, dropped=ensDropped)
+				elif not saveEns:
+					outputs.append(np.c_[fingerprints])
 				
-				# reset counter
-				i = 0
+				if saveEns:
+					if csv:
+						write_json(checkpoint, {'model': modelHash, 'energyWindow': energyWindow,
+												'ensembles': done, 'dropped': dropped})
+					print('ensemble %d saved'%adsEnsId)
+		finally:
+			# stop the workers once all results are received, or if a worker or the writer raised
+			if pool is not None:
+				pool.terminate()
+				pool.join()
+		
+		if not csv:
+			writer.close()
+			if energyIndex:
+				build_energy_index(filename)
+		elif not saveEns:
+		
+			# save csv		
+			np.savetxt(filename, np.concatenate(outputs), fmt=fmt, delimiter=',')
+		
+		if energyWindow is not None:
+			print('multiplicity of the fingerprints outside the energy window: %d'%sum(dropped))
+		
+		return sum(dropped)
+
+	def zone_weights(self, tables, fractions=None):
+		'''return a list with the weight of each ensemble of each zone: the multiplicity of the
+		ensemble, or if molar fractions are given, the probability of the ensemble in a random alloy
+		tables		list of tuples	zone tables as returned by zone_tables()
+		fractions	list of floats	molar fractions of the metals (default: multiplicities)'''
+		weights = []
+		for zoneCounts, _, zoneMults in tables:
+			if fractions is None:
+				weights.append(zoneMults.astype('float'))
+			else:
+				weights.append(zoneMults*np.prod(np.asarray(fractions, dtype='float')**zoneCounts, axis=1))
+		return weights
+
+	def energy_histogram(self, w, nMetals, zoneSizes, binEdges, fractions=None):
+		'''return the histogram of the predicted energies of all fingerprints weighted by their
+		multiplicity (or probability, if molar fractions are given), and the histograms of each
+		adsorption ensemble (no. of adsorption ensembles x no. of bins), without enumerating the
+		fingerprints. Since the model is additive in the zones, the energies of the combinations of
+		the ensembles of the small zones (all but the adsorption ensemble zone and the zone with the
+		most ensembles) are enumerated and sorted with their cumulative weights, and the weight of
+		the fingerprints below each bin edge is counted by searching the remaining energy for each
+		ensemble of the largest zone. The histogram is thus exact, with the bins of np.histogram
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		binEdges	array of floats	increasing edges of the energy bins
+		fractions	list of floats	molar fractions of the metals (default: multiplicities)'''
+		
+		tables = self.zone_tables(w, nMetals, zoneSizes)
+		weights = self.zone_weights(tables, fractions)
+		binEdges = np.asarray(binEdges, dtype='float')
+		
+		# zone with the most ensembles besides the adsorption ensemble zone
+		largest = 1 + int(np.argmax([len(table[0]) for table in tables[1:]]))
+		largestEnergies, largestWeights = tables[largest][1], weights[largest]
+		
+		# energies and weights of all combinations of the ensembles of the small zones, sorted by
+		# energy, and the weight of the combinations before each of them
+		sums, sumWeights = np.zeros(1), np.ones(1)
+		for zoneId in range(1, len(tables)):
+			if zoneId != largest:
+				sums = np.add.outer(sums, tables[zoneId][1]).ravel()
+				sumWeights = np.multiply.outer(sumWeights, weights[zoneId]).ravel()
+		order = np.argsort(sums, kind='mergesort')
+		sums = sums[order]
+		cumWeights = np.concatenate(([0.], np.cumsum(sumWeights[order])))
+		
+		_, adsEnergies, _ = tables[0]
+		ensHists = np.zeros((len(adsEnergies), len(binEdges) - 1))
+		for adsEnsId, (adsEnergy, adsWeight) in enumerate(zip(adsEnergies, weights[0])):
 			
-			# adsorption ensemble fingerprint
-			# e.g. [1, 0, 0, 0, 0]
-			adsFp = [0]*nZoneEns[0]
-			adsFp[adsEnsId] = 1
+			# energy left for the small zones below each bin edge
+			# (no. of bin edges x ensembles of the largest zone)
+			limits = binEdges[:, np.newaxis] - (adsEnergy + largestEnergies)
 			
-			# count metals in adsorption ensembe
-			# e.g. [1, 0, 0, 0, 0]
-			adsCount = count_metals(adsEns, nMetals)
+			# number of combinations below each bin edge, with the last bin closed on the right
+			ids = np.searchsorted(sums, limits, side='left')
+			ids[-1] = np.searchsorted(sums, limits[-1], side='right')
 			
-			# multiplicity of adsorption ensemble
-			# e.g. 1
-			adsMult = multiplicity(zoneSizes[0], adsCount)
+			# weight of the fingerprints below each bin edge
+			below = adsWeight*np.dot(cumWeights[ids], largestWeights)
+			ensHists[adsEnsId] = np.diff(below)
+		
+		return ensHists.sum(axis=0), ensHists
+
+	def fingerprint_samples(self, w, nMetals, zoneSizes, fractions, batchSize=2**16, seed=None):
+		'''yield an endless sequence of batches of (counts, energies) of fingerprints drawn at random
+		from an alloy with the molar fractions given, with the ensemble of each zone drawn from
+		the multinomial distribution of its atoms, i.e. with the probability given by
+		zone_weights(). The cost of each fingerprint is independent of the number of fingerprints
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		fractions	list of floats	molar fractions of the metals
+		batchSize	int				number of fingerprints in each batch
+		seed		int				seed of the random number generator'''
+		rng = np.random.RandomState(seed)
+		tables = self.zone_tables(w, nMetals, zoneSizes)
+		
+		# cumulative distribution of the ensembles of each zone
+		cdfs = [np.cumsum(zoneWeights) / zoneWeights.sum()
+				for zoneWeights in self.zone_weights(tables, fractions)]
+		
+		while True:
+			counts = np.zeros((batchSize, nMetals), dtype='int64')
+			energies = np.zeros(batchSize)
+			for (zoneCounts, zoneEnergies, _), cdf in zip(tables, cdfs):
+				ids = np.searchsorted(cdf, rng.random_sample(batchSize), side='right')
+				ids = np.minimum(ids, len(cdf) - 1)
+				counts += zoneCounts[ids]
+				energies += zoneEnergies[ids]
+			yield counts, energies
+
+	def monte_carlo_activity(self, w, nMetals, zoneSizes, fractions, energyOpt, kBT, rtol=1e-3,
+							 batchSize=2**16, maxSamples=2**28, seed=None):
+		'''return the activity of an alloy with the molar fractions given, i.e. the average of
+		exp(-|E - energyOpt|/kBT) over its fingerprints, its standard error and the number of
+		fingerprints sampled, estimated from batches of random fingerprints until the standard
+		error is below rtol times the activity (or maxSamples fingerprints were sampled)
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		fractions	list of floats	molar fractions of the metals
+		energyOpt	float			optimal adsorption energy (eV)
+		kBT			float			Boltzmann's constant times temperature (eV)
+		rtol		float			target standard error relative to the activity
+		batchSize	int				number of fingerprints in each batch
+		maxSamples	int				maximum number of fingerprints to sample
+		seed		int				seed of the random number generator'''
+		total, totalSq, n = 0., 0., 0
+		for _, energies in self.fingerprint_samples(w, nMetals, zoneSizes, fractions, batchSize,
+													seed):
+			weights = np.exp(-np.abs(energies - energyOpt) / kBT)
+			total += weights.sum()
+			totalSq += np.dot(weights, weights)
+			n += len(weights)
 			
-			# loop through all remaining zones, generated by counting the metals
-			# e.g. [[6, 0, 0, 0, 0], [3, 0, 0, 0, 0]]
-			for theseZoneCounts in it.product(*zoneCounts[1:]):
-				
-				# link zone counts together
-				# e.g. [6, 0, 0, 0, 0, 3, 0, 0, 0, 0]
-				zoneFp = list(it.chain.from_iterable(theseZoneCounts))
-				
-				# append to adsorption fingerprint to make the final fingerprint
-				fp = np.array(adsFp + zoneFp)
-
-				# predict energy
-				energies[i] = self.predicted_energies(fp, w)
-
-				# count of metals of fingerprint
-				# e.g. [10, 0, 0, 0, 0]
-				counts[i] = (np.array(adsCount) + 
-							 sum(np.array(thisZoneCounts) for thisZoneCounts in theseZoneCounts))
-							 
-				# multiplicity of fingerprint	
-				# e.g. 1
-				mults[i] = (adsMult * 
-							np.prod([multiplicity(zoneSize, zoneCount) 
-							for zoneSize, zoneCount in zip(zoneSizes[1:], theseZoneCounts)]))
-				
-				# increment counter
-				i += 1
-				
-			if saveEns:
-				output = np.c_[counts, energies, mults]
-				
-				# add an underscored number of the current ensemble in the filename
-				parts = filename.rpartition('.')
-				fname = parts[0] + '_%d'%adsEnsId + parts[1] + parts[2]
-				
-				# save file for the current ensemble
-				np.savetxt(fname, output, fmt=['%d']*nMetals+['%.5f']+['%d'], delimiter=',')
-				print('ensemble %d saved'%adsEnsId)
+			mean = total / n
+			stdErr = np.sqrt(max(totalSq / n - mean**2, 0.) / (n - 1))
+			if stdErr < rtol*mean or n >= maxSamples:
+				return mean, stdErr, n
+
+	def monte_carlo_histogram(self, w, nMetals, zoneSizes, fractions, binEdges, atol=1e-4,
+							  batchSize=2**16, maxSamples=2**28, seed=None):
+		'''return the probability of the predicted energy of a fingerprint of an alloy with the
+		molar fractions given to be in each bin, the standard errors of the probabilities and the
+		number of fingerprints sampled, estimated from batches of random fingerprints until all
+		standard errors are below atol (or maxSamples fingerprints were sampled)
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		fractions	list of floats	molar fractions of the metals
+		binEdges	array of floats	edges of the energy bins
+		atol		float			target standard error of the probabilities
+		batchSize	int				number of fingerprints in each batch
+		maxSamples	int				maximum number of fingerprints to sample
+		seed		int				seed of the random number generator'''
+		hist, n = np.zeros(len(binEdges) - 1), 0
+		for _, energies in self.fingerprint_samples(w, nMetals, zoneSizes, fractions, batchSize,
+													seed):
+			hist += np.histogram(energies, binEdges)[0]
+			n += len(energies)
+			
+			# standard error of the fraction of fingerprints in each bin
+			probabilities = hist / n
+			stdErrs = np.sqrt(probabilities*(1 - probabilities) / (n - 1))
+			if stdErrs.max() < atol or n >= maxSamples:
+				return probabilities, stdErrs, n
+
+
+	def nearest_fingerprints(self, w, nMetals, zoneSizes, target, k=10):
+		'''return the row indices (in the order of all_fingerprints()), the counts of each metal
+		(k x nMetals), the predicted energies and the multiplicities of the k fingerprints with
+		predicted energies closest to target, sorted by distance to target. Since the model is
+		additive in the zones, the fingerprints within a window around target are found by
+		branch-and-bound over the zones, leaving out partial fingerprints whose range of
+		possible energies misses the window, with the last zone looked up by binary search in its
+		sorted energies. The window is widened until it contains k fingerprints
+		w			list of floats	linear regression parameters
+		nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)
+		target		float			target energy, e.g. the optimal adsorption energy (eV)
+		k			int				number of fingerprints to return'''
+		tables = self.zone_tables(w, nMetals, zoneSizes)
+		nZoneEns = [len(table[0]) for table in tables]
 		
-		if not saveEns:
+		# branch on the zones with fewer ensembles first, and look up the largest zone last
+		order = np.argsort(nZoneEns, kind='mergesort')
+		zoneEnergies = [tables[z][1] for z in order]
+		lastOrder = np.argsort(zoneEnergies[-1])
+		lastSorted = zoneEnergies[-1][lastOrder]
 		
-			# save csv		
-			output = np.c_[counts, energies, mults]
-			np.savetxt(filename, output, fmt=['%d']*nMetals+['%.5f']+['%d'], delimiter=',')
\ No newline at end of file
+		# lowest and highest sum of the energies of the zones from each zone onwards
+		restMin = np.append(np.cumsum([e.min() for e in zoneEnergies][::-1])[::-1], 0.)
+		restMax = np.append(np.cumsum([e.max() for e in zoneEnergies][::-1])[::-1], 0.)
+		
+		# distance from target to the nearest possible energy, and a small initial margin
+		distance = max(restMin[0] - target, target - restMax[0], 0.)
+		margin = (restMax[0] - restMin[0])*1e-6
+		while True:
+			lower, upper = target - distance - margin, target + distance + margin
+			
+			# partial fingerprints of all zones but the last that can reach the window
+			sums, ids = np.zeros(1), np.zeros((1, 0), dtype='int64')
+			for z, energies in enumerate(zoneEnergies[:-1]):
+				sums = (sums[:, np.newaxis] + energies).ravel()
+				ids = np.concatenate((np.repeat(ids, len(energies), axis=0),
+									  np.tile(np.arange(len(energies)), len(ids))[:, np.newaxis]),
+									 axis=1)
+				keep = (sums + restMin[z+1] <= upper) & (sums + restMax[z+1] >= lower)
+				sums, ids = sums[keep], ids[keep]
+			
+			# range of the sorted energies of the last zone within the window
+			starts = np.searchsorted(lastSorted, lower - sums, side='left')
+			stops = np.searchsorted(lastSorted, upper - sums, side='right')
+			if (stops - starts).sum() >= k or (lower <= restMin[0] and upper >= restMax[0]):
+				break
+			margin *= 2
+		
+		# fingerprints within the window
+		lengths = stops - starts
+		partialIds = np.repeat(np.arange(len(sums)), lengths)
+		positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+		lastIds = lastOrder[starts[partialIds] + positions]
+		energies = sums[partialIds] + zoneEnergies[-1][lastIds]
+		
+		# the k closest to target
+		best = np.argsort(np.abs(energies - target), kind='mergesort')[:k]
+		zoneIds = np.concatenate((ids[partialIds[best]], lastIds[best, np.newaxis]), axis=1)
+		
+		# ensemble of each zone in the original order of the zones
+		zoneIds = zoneIds[:, np.argsort(order)]
+		rows = np.ravel_multi_index(tuple(zoneIds.T), nZoneEns)
+		counts = np.zeros((len(best), nMetals), dtype='int64')
+		mults = np.ones(len(best), dtype='int64')
+		for (zoneCounts, _, zoneMults), zoneId in zip(tables, zoneIds.T):
+			counts += zoneCounts[zoneId]
+			mults *= zoneMults[zoneId]
+		
+		return rows, counts, energies[best], mults
+
+class IncrementalRegression(LinearRegression):
+	'''linear regression fitted from the sufficient statistics X^T X, X^T t and t^T t of the
+	training data instead of the data itself. Batches of samples are added or removed in
+	O(no. of samples x no. of features^2), so the parameters can be refitted as new DFT data
+	arrives, and training sets larger than memory can be streamed'''
+	def __init__(self, nMetals, zoneSizes):
+		'''nMetals		int				number of metals in the alloy, e.g. 5
+		zoneSizes	list of ints	number of atoms in the fingerprint zones, e.g. (1, 6, 3)'''
+		LinearRegression.__init__(self)
+		self.nMetals = nMetals
+		self.zoneSizes = tuple(zoneSizes)
+		nFeatures = self.n_features(nMetals, zoneSizes)
+		
+		self.XTX = np.zeros((nFeatures, nFeatures))
+		self.XTt = np.zeros(nFeatures)
+		self.tTt = 0.
+		self.n = 0
+		
+		# number of samples with a nonzero value of each feature
+		self.nNonzero = np.zeros(nFeatures, dtype='int64')
+
+	def update(self, X, t, sign):
+		'''add (sign=1) or remove (sign=-1) the samples given from the statistics
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values
+		sign		int											1 to add, -1 to remove'''
+		X = np.atleast_2d(np.asarray(X, dtype='float'))
+		t = np.atleast_1d(np.asarray(t, dtype='float'))
+		if X.shape != (len(t), len(self.XTt)):
+			raise ValueError('expected %d samples with %d features, got an array of shape %s'
+							 % (len(t), len(self.XTt), X.shape))
+		
+		nNonzero = self.nNonzero + sign*np.count_nonzero(X, axis=0)
+		if sign < 0 and (self.n < len(t) or np.any(nNonzero < 0)):
+			raise ValueError('cannot remove samples that were not added')
+		
+		self.XTX += sign*np.dot(X.T, X)
+		self.XTt += sign*np.dot(X.T, t)
+		self.tTt += sign*np.dot(t, t)
+		self.n += sign*len(t)
+		self.nNonzero = nNonzero
+
+	def add(self, X, t):
+		'''add samples to the training data
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values'''
+		self.update(X, t, 1)
+
+	def remove(self, X, t):
+		'''remove samples previously added to the training data, e.g. slabs found to be bad
+		X 			array (no. of samples x no. of features) 	features
+		t 			array (no. of samples)						target values'''
+		self.update(X, t, -1)
+
+	def add_samples(self, samples, batchSize=1024):
+		'''add the samples of an iterable of (fingerprint, target value) pairs in batches, e.g.
+		from a generator over an ASE database, holding at most one batch in memory, and return the
+		number of samples added
+		samples		iterable of tuples	(fingerprint, target value) of each sample
+		batchSize	int					number of samples in each batch'''
+		nAdded = 0
+		samples = iter(samples)
+		while True:
+			batch = list(it.islice(samples, batchSize))
+			if len(batch) == 0:
+				return nAdded
+			
+			X, t = zip(*batch)
+			self.add(X, t)
+			nAdded += len(batch)
+
+	def fitted_weights(self):
+		'''return the linear regression parameters of all features fitted to the current training
+		data, centered as by weights(). Features that are zero for all samples are disregarded
+		and have zero parameters before centering'''
+		
+		# leave out features that are zero for all samples to avoid singular matrices
+		keep = self.nNonzero > 0
+		self.keepIds = list(np.flatnonzero(keep))
+		
+		# the parameters are only determined up to the fixed number of atoms in each zone, which
+		# the centering fixes, so take the least squares solution of smallest norm
+		w = np.zeros(len(self.XTt))
+		w[keep] = np.linalg.lstsq(self.XTX[np.ix_(keep, keep)], self.XTt[keep], rcond=None)[0]
+		
+		## center parameters around the average (except first zone)
+		return self.center_weights(w, self.nMetals, self.zoneSizes)
+
+	def rmsd(self, w):
+		'''return the root mean square deviation of the predictions of the current training data
+		w			list of floats	linear regression parameters of all features'''
+		w = np.asarray(w, dtype='float')
+		sse = self.tTt - 2*np.dot(w, self.XTt) + np.dot(w, np.dot(self.XTX, w))
+		return np.sqrt(max(sse, 0.) / self.n)
+
+	def save_statistics(self, filename, **arrays):
+		'''save the statistics of the training data to the npz file filename, together with any
+		arrays given as keywords, e.g. the last database id added
+		filename	String		name of the npz file'''
+		np.savez(filename, XTX=self.XTX, XTt=self.XTt, tTt=self.tTt, n=self.n,
+				 nNonzero=self.nNonzero, nMetals=self.nMetals, zoneSizes=self.zoneSizes, **arrays)
+
+	def load_statistics(self, filename):
+		'''load statistics saved by save_statistics() into this instance and return a dict of the
+		arrays that were saved with them as keywords. Raise ValueError if they were saved for
+		other zones
+		filename	String		name of the npz file'''
+		data = dict(np.load(filename))
+		if (int(data.pop('nMetals')) != self.nMetals
+			or tuple(data.pop('zoneSizes')) != self.zoneSizes):
+			raise ValueError('%s holds statistics of other zones' % filename)
+		
+		self.XTX, self.XTt = data.pop('XTX'), data.pop('XTt')
+		self.tTt, self.n = float(data.pop('tTt')), int(data.pop('n'))
+		self.nNonzero = data.pop('nNonzero')
+		return data
+
+# zone tables of the process, set by _init_worker
+_workerTables = None
+
+def _init_worker(tables):
+	'''store the zone tables used by _ensemble_worker in the current process
+	tables		list of tuples	zone tables as returned by LinearRegression.zone_tables()'''
+	global _workerTables
+	_workerTables = tables
+
+def _ensemble_worker(task):
+	'''return the adsorption ensemble id of the task together with the counts, energies and
+	multiplicities of its fingerprints (or None if they were saved to a csv file instead) and the
+	total multiplicity of the fingerprints outside the energy window
+	task		tuple			(adsEnsId, fname, dtypes, energyWindow) where fname is the name of
+								the csv file to save to (or None), dtypes are the three data types
+								to return the fingerprints as (or the csv format if fname is given)
+								and energyWindow is the (lower, upper) energies to keep (or None)'''
+	adsEnsId, fname, dtypes, energyWindow = task
+	counts, energies, mults = LinearRegression().ensemble_fingerprints(adsEnsId, _workerTables)
+	
+	# leave out fingerprints outside the energy window
+	dropped = 0
+	if energyWindow is not None:
+		keep = (energies >= energyWindow[0]) & (energies <= energyWindow[1])
+		dropped = int(mults[~keep].sum())
+		counts, energies, mults = counts[keep], energies[keep], mults[keep]
+	
+	if fname is not None:
+		np.savetxt(fname, np.c_[counts, energies, mults], fmt=dtypes, delimiter=',')
+		return adsEnsId, None, dropped
+	
+	return adsEnsId, tuple(np.asarray(data, dtype=dtype)
+						   for data, dtype in zip((counts, energies, mults), dtypes)), dropped
@@ -0,0 +1,129 @@
+import numpy as np
+from helperMethods import zone_counts, Monomials
+
+# in-plane lattice vectors of the fcc(111) surface in units of the nearest neighbour distance
+cell = np.array([[1., 0.], [0.5, np.sqrt(3.)/2]])
+
+# in-plane positions of the surface (1) and subsurface (2) layers in lattice coordinates, as
+# stacked by ase.build.fcc111
+layerShifts = {1: np.array([0., 0.]), 2: np.array([2/3., 2/3.])}
+
+# in-plane positions of the adsorption sites relative to the surface atom of the site in lattice
+# coordinates. The fcc hollow has no subsurface atom below it
+siteShifts = {'onTop': np.array([0., 0.]), 'fcc': np.array([1/3., 1/3.])}
+
+# atoms of the zones of Slab.features as (layer, start, stop) in Slab.closest, i.e. the atoms in
+# the layer from the start-th to the stop-th closest to the adsorbate. Atoms listed twice are
+# counted twice, as in Slab.surface and Slab.subsurface
+zoneAtoms = {'onTop': {'ens': [(1, 1, 1)],
+					   's': [(1, 2, 7)],
+					   'ss': [(2, 1, 3)],
+					   'sn': [(1, 2, 7)],
+					   'ssn': [(2, 1, 3)]},
+			 'fcc': {'ens': [(1, 1, 3)],
+					 's': [(1, 4, 6), (1, 4, 6), (1, 7, 12)],
+					 'ss': [(2, 1, 3), (2, 1, 3), (2, 4, 6)],
+					 'sn': [(1, 4, 6)],
+					 'ssn': [(2, 1, 3)],
+					 'sf': [(1, 7, 12)],
+					 'ssf': [(2, 4, 6)]}}
+
+def closest_offsets(site, layer, start, stop, reach=4):
+	'''return the lattice offsets (n x 2) of the atoms in the layer from the start-th to the
+	stop-th closest to the adsorbate of a site, relative to the surface atom of the site, found
+	numerically from the ideal lattice. Raise ValueError if the atoms are not a complete set of
+	equidistant shells
+	site		String		adsorption site ('onTop' or 'fcc')
+	layer		int			1: surface, 2: subsurface
+	start		int			rank of the closest atom to return
+	stop		int			rank of the furthest atom to return
+	reach		int			largest lattice offset to consider'''
+	offsets = np.array([(i, j) for i in range(-reach, reach+1) for j in range(-reach, reach+1)])
+
+	# in-plane distances, since the height of the layer below the adsorbate is the same
+	# for all atoms of the layer
+	positions = np.dot(offsets + layerShifts[layer] - siteShifts[site], cell)
+	distances = np.round(np.sqrt((positions**2).sum(axis=1)), 6)
+	order = np.argsort(distances, kind='mergesort')
+	distances = distances[order]
+
+	splitStart = start > 1 and distances[start-2] == distances[start-1]
+	if splitStart or distances[stop-1] == distances[stop]:
+		raise ValueError('atoms %d to %d of layer %d of %s site split a shell of equidistant atoms'
+						 % (start, stop, layer, site))
+
+	return offsets[order][start-1:stop]
+
+class Surface(object):
+	'''periodic fcc(111) surface of random metals, stored as integer-encoded lattices of the
+	surface and subsurface layers. The zones of all adsorption sites are counted at once by
+	summing the lattices shifted by the neighbour offsets (stencils) of Slab.features'''
+	def __init__(self, fractions, size=(200, 200), seed=None):
+		'''fractions	list of floats	molar fractions of the metals
+		size		tuple of ints	number of surface atoms along the two lattice vectors
+		seed		int				seed of the random number generator'''
+		rng = np.random.RandomState(seed)
+		fractions = np.asarray(fractions, dtype='float')
+		self.nMetals = len(fractions)
+		self.size = tuple(size)
+
+		# metal id of each atom in the surface (1) and subsurface (2) layers
+		p = fractions / fractions.sum()
+		self.layers = dict((layer, rng.choice(self.nMetals, size=self.size, p=p).astype('uint8'))
+						   for layer in (1, 2))
+
+	def counts(self, site, zone):
+		'''return the number of each metal in the zone of every site (size x nMetals)
+		site		String		adsorption site ('onTop' or 'fcc')
+		zone		String		zone of Slab.features, e.g. 's' or 'ssn' '''
+		unit = np.eye(self.nMetals, dtype='uint8')
+		counts = np.zeros(self.size + (self.nMetals, ), dtype='uint8')
+		for layer, start, stop in zoneAtoms[site][zone]:
+			for di, dj in closest_offsets(site, layer, start, stop):
+
+				# metal of the atom at offset (di, dj) of every site
+				shifted = np.roll(self.layers[layer], (-di, -dj), axis=(0, 1))
+				counts += unit[shifted]
+		return counts
+
+	def features(self, site, zones):
+		'''return the fingerprint of every site (no. of sites x no. of features), as given by
+		Slab.features, with the sites in row-major order of the surface lattice
+		site		String			adsorption site ('onTop' or 'fcc')
+		zones		list of Strings	zones of the fingerprint, e.g. ('ens', 's', 'ss')'''
+		nSites = self.size[0]*self.size[1]
+		features = []
+		for zone in zones:
+			counts = self.counts(site, zone).reshape(nSites, self.nMetals)
+			if zone == 'ens':
+				# one-hot adsorption ensemble
+				ensSize = int(counts[0].sum())
+				ensIds = Monomials(self.nMetals, ensSize).ids(counts)
+				nEns = len(zone_counts(self.nMetals, ensSize))
+				features.append(np.eye(nEns, dtype='uint8')[ensIds])
+			else:
+				features.append(counts)
+		return np.concatenate(features, axis=1)
+
+	def energies(self, w, site, zones):
+		'''return the predicted adsorption energy of every site (size), evaluated zone by zone
+		without forming the fingerprints
+		w			list of floats	linear regression parameters of all features, e.g. from
+									LinearRegression.full_weights()
+		site		String			adsorption site ('onTop' or 'fcc')
+		zones		list of Strings	zones of the fingerprint, e.g. ('ens', 's', 'ss')'''
+		w = np.asarray(w, dtype='float')
+		energies = np.zeros(self.size)
+		start = 0
+		for zone in zones:
+			counts = self.counts(site, zone)
+			if zone == 'ens':
+				# parameter of the adsorption ensemble of each site
+				ensSize = int(counts[0, 0].sum())
+				ensIds = Monomials(self.nMetals, ensSize).ids(counts.reshape(-1, self.nMetals))
+				energies += w[start + ensIds].reshape(self.size)
+				start += len(zone_counts(self.nMetals, ensSize))
+			else:
+				energies += np.dot(counts, w[start:start+self.nMetals])
+				start += self.nMetals
+		return energies
@@ -66,4 +66,76 @@ def multiplicity(nAtoms, nEachMetal):
 	product = 1
 	for nMetal in nEachMetal:
 		product *= factorial(nMetal)
-	return factorial(nAtoms)/product
\ No newline at end of file
+	return factorial(nAtoms)/product
+
+def zone_counts(nMetals, zoneSize):
+	'''return array (no. of zone ensembles x nMetals) of the counts of each metal in all
+	ensembles of a zone, in the order given by itertools.combinations_with_replacement
+	nMetals		int		number of metals in alloy
+	zoneSize	int		number of atoms in zone'''
+	enss = it.combinations_with_replacement(range(nMetals), zoneSize)
+	return np.array([count_metals(ens, nMetals) for ens in enss], dtype='int64').reshape(-1, nMetals)
+
+class Monomials(object):
+	'''all count vectors (monomials) of a number of atoms of the metals, in the order given by
+	zone_counts, with a look-up of the id of any count vector by an integer key'''
+	def __init__(self, nMetals, nAtoms):
+		'''nMetals	int		number of metals in alloy
+		nAtoms		int		number of atoms of each count vector'''
+		self.counts = zone_counts(nMetals, nAtoms)
+		self.base = (nAtoms + 1)**np.arange(nMetals)
+		self.keys = np.dot(self.counts, self.base)
+		self.order = np.argsort(self.keys)
+
+	def ids(self, counts):
+		'''return the id of each count vector given. Raise ValueError if any of them is not a
+		count vector of nAtoms atoms of the metals
+		counts		array (n x nMetals)		number of each metal'''
+		counts = np.asarray(counts, dtype='int64').reshape(-1, len(self.base))
+		keys = np.dot(counts, self.base)
+		positions = np.searchsorted(self.keys, keys, sorter=self.order)
+		ids = self.order[np.minimum(positions, len(self.keys) - 1)]
+		
+		# keys of invalid count vectors are missing or belong to another count vector
+		invalid = np.any(self.counts[ids] != counts, axis=1)
+		if np.any(invalid):
+			raise ValueError('%s is not a count vector of %d atoms'
+							 % (counts[np.argmax(invalid)].tolist(), self.counts[0].sum()))
+		return ids
+
+def multiplicities(zoneSize, counts):
+	'''return array of the integer multiplicity of each row of metal counts
+	zoneSize	int						number of atoms in zone
+	counts		array (n x nMetals)		number of each metal in zone'''
+	mults = np.zeros(len(counts), dtype='int64')
+	for i, count in enumerate(counts):
+		denominator = 1
+		for n in count:
+			denominator *= factorial(n)
+		mults[i] = factorial(zoneSize) // denominator
+	return mults
+
+
+def activity_window(energyOpt, kBT, minWeight):
+	'''return the (lower, upper) energies within which the activity weight
+	exp(-|E - energyOpt|/kBT) of a fingerprint is at least minWeight
+	energyOpt	float	optimal adsorption energy (eV)
+	kBT			float	Boltzmann's constant times temperature (eV)
+	minWeight	float	smallest activity weight to keep, e.g. 1e-6'''
+	width = -kBT*np.log(minWeight)
+	return (energyOpt - width, energyOpt + width)
+
+def project_simplex(v):
+	'''return the Euclidean projection of each row of v onto the simplex of molar fractions,
+	i.e. the closest rows of non-negative fractions summing to unity
+	v		array (n x nMetals)		points to project'''
+	v = np.asarray(v, dtype='float')
+	nMetals = v.shape[1]
+
+	# threshold that makes the positive parts of each row sum to unity
+	u = -np.sort(-v, axis=1)
+	cumsum = np.cumsum(u, axis=1) - 1
+	positive = u - cumsum / np.arange(1, nMetals+1) > 0
+	rho = nMetals - 1 - np.argmax(positive[:, ::-1], axis=1)
+	theta = cumsum[np.arange(len(v)), rho] / (rho + 1)
+	return np.maximum(v - theta[:, np.newaxis], 0)
@@ -1,5 +1,6 @@
-'''write csv file with all possible fingerprints with the number of each element, the OH adsorption
-energy and the fingerprint multiplicity'''
+'''write a fingerprint table with all possible fingerprints with the number of each element, the OH
+adsorption energy and the fingerprint multiplicity. Pass csv=True to all_fingerprints to write
+OH_all_slabs.csv instead'''
 
 import sys
 import numpy as np
@@ -17,8 +18,12 @@ csvTrain = '../DFT_histogram/OH_train.csv'
 XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(15))
 ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
 
-# calculate linear regression parameters
-w = model.weights(XTrain, ETrain, nMetals=5, zoneSizes=(1, 6, 3))
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals=5, zoneSizes=(1, 6, 3),
+			  filename='../DFT_histogram/OH_model.json')
 
-# predict energies of all possible fingerprints using linear regression parameters and save to file
-model.all_fingerprints('OH_all_slabs.csv', w, nMetals=5, zoneSizes=(1, 6, 3))
\ No newline at end of file
+# predict energies of all possible fingerprints using linear regression parameters and save to file,
+# and index the energies for energy window and quantile queries
+model.all_fingerprints('OH_all_slabs', w, nMetals=5, zoneSizes=(1, 6, 3),
+					   metals=('Ir', 'Pd', 'Pt', 'Rh', 'Ru'), energyIndex=True)
\ No newline at end of file
@@ -0,0 +1,13 @@
+'''verify that the shards written by O_all_slabs_write_shard.py cover all O fingerprints exactly once
+with the same model, and merge them into the fingerprint table O_all_slabs'''
+
+import sys
+from glob import glob
+
+# load functions for fingerprint tables
+sys.path.append('../model')
+from FingerprintTable import merge_shards
+
+# merge all shards in the current directory, and index the energies for energy window and
+# quantile queries
+merge_shards(glob('O_all_slabs_shard_*'), 'O_all_slabs', energyIndex=True)
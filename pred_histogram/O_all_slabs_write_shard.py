@@ -0,0 +1,35 @@
+'''write one shard of the fingerprint table of all possible O fingerprints, so that the generation can be
+spread over several nodes, e.g. as a batch array job. Run as
+
+	python O_all_slabs_write_shard.py <shard id> <number of shards>
+
+and join the shards with O_all_slabs_merge_shards.py afterwards'''
+
+import sys
+import numpy as np
+
+# id of this shard and total number of shards
+shardId, nShards = int(sys.argv[1]), int(sys.argv[2])
+
+# load LinearRegression class
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+model = LinearRegression()
+
+# location and name of training set
+csvTrain = '../DFT_histogram/O_train.csv'
+
+# load training adsorption energies
+XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(55))
+ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals=5, zoneSizes=(3, 6, 3, 3, 3),
+			  filename='../DFT_histogram/O_model.json')
+
+# predict energies of the fingerprints of this shard and save to file, continuing from the last
+# block saved if a previous run of this shard was interrupted
+model.shard_fingerprints('O_all_slabs_shard_%d'%shardId, w, nMetals=5, zoneSizes=(3, 6, 3, 3, 3),
+						 shardId=shardId, nShards=nShards, metals=('Ir', 'Pd', 'Pt', 'Rh', 'Ru'),
+						 resume=True)
@@ -1,16 +1,18 @@
-'''generates the histogram for the distribution of O adsorption energies. Takes around 20 min.'''
+'''generates the exact histogram for the distribution of O adsorption energies from the energy
+contributions of the fingerprint zones, without enumerating the fingerprints. Takes a few seconds.'''
 
 import matplotlib.pyplot as plt
 from matplotlib.pyplot import cm
 import numpy as np
-from math import factorial as fact
 import sys
 
-# update system path to be able to import the plot function
+# update system path to be able to import the plot function and the LinearRegression class
 sys.path.append('../model')
 
 # import plot function
 from plot import applyPlotStyle
+from LinearRegression import LinearRegression
+model = LinearRegression()
 
 # number of metals
 nMetals = 5
@@ -18,14 +20,26 @@ nMetals = 5
 # number of atoms in zones
 zoneSizes = (3, 6, 3, 3, 3)
 
-# location and name of csv file (without numbering)
-filename = 'O_all_slabs.csv'
+# location and name of training set
+csvTrain = '../DFT_histogram/O_train.csv'
+
+# load training adsorption energies
+XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(55))
+ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals, zoneSizes, filename='../DFT_histogram/O_model.json')
 
-nEns = fact(nMetals+zoneSizes[0]-1)/(fact(zoneSizes[0])*fact(nMetals-1))
 start, stop, spacing = -0.5, 2.5, 0.0075
 binedges = np.arange(start, stop+spacing, spacing)
 centerbins = binedges[:-1]+spacing/2
-counts = np.zeros(len(binedges)-1, dtype='int64')
+
+# multiplicity-weighted histograms of all fingerprints and of each adsorption ensemble
+counts, ensCounts = model.energy_histogram(w, nMetals, zoneSizes, binedges)
+
+# number of adsorption ensembles
+nEns = len(ensCounts)
 
 # define figure
 fig, ax = plt.subplots(figsize=(4,3))
@@ -68,20 +82,11 @@ for i in range(nEns):
 		label = 'individual sites'
 	else:
 		label = ''
-		
-	parts = filename.rpartition('.')
-	fname = parts[0] + '_%d'%i + parts[1] + parts[2]
-	energies = np.loadtxt(fname, dtype='float', delimiter=',', usecols=5)
-	mults = np.loadtxt(fname, dtype='int64', delimiter=',', usecols=6)
-	count, _ = np.histogram(energies, binedges, weights=mults)
-	counts += count
 	
 	# plot individual ensemble
-	plt.hist(centerbins, bins=binedges, weights=count, 
+	plt.hist(centerbins, bins=binedges, weights=ensCounts[i], 
 			 facecolor=colors[orderId[i]], ec='black', alpha=0.75, 
 			 histtype='stepfilled', zorder=1, label=label)
-			 
-	print('file %d read'%i)
 
 # plot total
 plt.hist(centerbins, bins=binedges, weights=counts, 
@@ -13,8 +13,10 @@ csvTrain = '../DFT_histogram/O_train.csv'
 XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(55))
 ETrain = np.loadtxt(csvTrain, dtype='float', delimiter=',', usecols=-1)
 
-# calculate linear regression parameters
-w = model.weights(XTrain, ETrain, nMetals=5, zoneSizes=(3, 6, 3, 3, 3))
+# load linear regression parameters of all features cached from the same training set, or
+# calculate and cache them
+w = model.fit(XTrain, ETrain, nMetals=5, zoneSizes=(3, 6, 3, 3, 3),
+			  filename='../DFT_histogram/O_model.json')
 
 # load test set fingerprints and energies
 csvTest = '../DFT_histogram/O_test.csv'
@@ -0,0 +1,76 @@
+'''print the 95% confidence intervals of the predicted OH and O adsorption energies given by
+bootstrap resamples of the training sets, and the 95% prediction intervals of the adsorption
+energies, which add a residual of the training set to the prediction of each resample, for the
+test sets and for all possible *OH fingerprints'''
+
+import sys
+import numpy as np
+
+# load LinearRegression class
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+model = LinearRegression()
+
+# number of bootstrap resamples
+nSamples = 1000
+
+# percentiles of the confidence and prediction intervals
+percentiles = (2.5, 97.5)
+
+def intervals(energies, residuals, rng):
+	'''return the lower and upper limits of the confidence intervals of the predicted energies and
+	of the prediction intervals of the energies, given the predictions of all resamples
+	(no. of fingerprints x nSamples), the latter with a random training set residual added to
+	each prediction
+	energies	array (no. of fingerprints x nSamples)	predicted energies of all resamples (eV)
+	residuals	array (no. of training samples)			residuals of the training set (eV)
+	rng			RandomState								random number generator of the residuals'''
+	noise = rng.choice(residuals, size=energies.shape)
+	return (np.percentile(energies, percentiles, axis=1),
+			np.percentile(energies + noise, percentiles, axis=1))
+
+# training set, test set, number of features and zone sizes of each adsorbate
+adsorbates = (('OH', '../DFT_histogram/OH_train.csv', '../DFT_histogram/OH_test.csv', 15,
+			   (1, 6, 3)),
+			  ('O', '../DFT_histogram/O_train.csv', '../DFT_histogram/O_test.csv', 55,
+			   (3, 6, 3, 3, 3)))
+
+for adsorbate, csvTrain, csvTest, nFeatures, zoneSizes in adsorbates:
+
+	# load training and test set fingerprints and energies
+	XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(nFeatures))
+	ETrain = np.loadtxt(csvTrain, dtype='float', delimiter=',', usecols=-1)
+	XTest = np.loadtxt(csvTest, dtype='int', delimiter=',', usecols=range(nFeatures))
+	ETest = np.loadtxt(csvTest, dtype='float', delimiter=',', usecols=-1)
+
+	# linear regression parameters of all resamples (no. of features x nSamples)
+	w = model.bootstrap_weights(XTrain, ETrain, 5, zoneSizes, nSamples, seed=0)
+
+	# residuals of the fit to the full training set, inflated by the number of parameters fitted
+	# so that their variance estimates the variance of the DFT energies about the model
+	wFit = model.weights(XTrain, ETrain, 5, zoneSizes)
+	residuals = ETrain - model.predicted_energies(XTrain, wFit)
+	nTrain = len(ETrain)
+	residuals *= np.sqrt(nTrain / float(nTrain - np.linalg.matrix_rank(XTrain)))
+	rng = np.random.RandomState(1)
+
+	# predictions of all resamples of the test set in a single matrix product
+	energies = model.predicted_energies(XTest, w)
+	(lower, upper), (predLower, predUpper) = intervals(energies, residuals, rng)
+	print('%-2s test set: mean width of 95%% confidence intervals = %.3f eV, max. width = %.3f eV'
+		  %(adsorbate, np.mean(upper - lower), np.max(upper - lower)))
+	print('%-2s test set: mean width of 95%% prediction intervals = %.3f eV, max. width = %.3f eV,'
+		  ' DFT energies inside = %.1f%%'
+		  %(adsorbate, np.mean(predUpper - predLower), np.max(predUpper - predLower),
+			100*np.mean((ETest >= predLower) & (ETest <= predUpper))))
+
+	# intervals of all possible fingerprints, predicted block by block from the zone tables
+	if adsorbate == 'OH':
+		widths = [[], []]
+		for counts, energies, mults in model.fingerprint_blocks(w, 5, zoneSizes, blockSize=2**12):
+			for i, (lower, upper) in enumerate(intervals(energies, residuals, rng)):
+				widths[i].append(upper - lower)
+		for name, width in zip(('confidence', 'prediction'), widths):
+			width = np.concatenate(width)
+			print('OH all %d fingerprints: mean width of 95%% %s intervals = %.3f eV,'
+				  ' max. width = %.3f eV'%(width.size, name, np.mean(width), np.max(width)))
@@ -0,0 +1,33 @@
+'''print the leave-one-out and k-fold cross-validation errors of the OH and O adsorption energy
+models, calculated from the training sets without refitting the models'''
+
+import sys
+import numpy as np
+
+# load LinearRegression class
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+model = LinearRegression()
+
+# number of folds of the k-fold cross-validation
+nFolds = 10
+
+# training set and number of features of each adsorbate
+adsorbates = (('OH', '../DFT_histogram/OH_train.csv', 15),
+			  ('O', '../DFT_histogram/O_train.csv', 55))
+
+for adsorbate, csvTrain, nFeatures in adsorbates:
+
+	# load training set fingerprints and energies
+	XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(nFeatures))
+	ETrain = np.loadtxt(csvTrain, dtype='float', delimiter=',', usecols=-1)
+
+	# root mean square deviation (RMSD) and mean absolute error (MAE) of the predictions of each
+	# sample by the model fitted without it, or without its fold
+	residuals, RMSD, MAE = model.cross_validation(XTrain, ETrain)
+	print('%-2s leave-one-out: RMSD = %.3f eV, MAE = %.3f eV, max. error = %.3f eV'
+		  %(adsorbate, RMSD, MAE, np.nanmax(np.abs(residuals))))
+
+	residuals, RMSD, MAE = model.cross_validation(XTrain, ETrain, nFolds=nFolds, seed=0)
+	print('%-2s %d-fold:        RMSD = %.3f eV, MAE = %.3f eV, max. error = %.3f eV'
+		  %(adsorbate, nFolds, RMSD, MAE, np.nanmax(np.abs(residuals))))
@@ -0,0 +1,40 @@
+'''print the ridge penalty with the smallest leave-one-out error of the OH and O adsorption energy
+models, for the full training sets and for small random subsets of them, e.g. as for a new alloy
+with few DFT calculations'''
+
+import sys
+import numpy as np
+
+# load LinearRegression class
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+model = LinearRegression()
+
+# ridge penalties to scan (eV^2 per parameter^2)
+penalties = np.concatenate(([0.], np.logspace(-4, 3, 71)))
+
+# number of samples in the small training sets
+nSmall = 100
+
+# training set, number of features and zone sizes of each adsorbate
+adsorbates = (('OH', '../DFT_histogram/OH_train.csv', 15, (1, 6, 3)),
+			  ('O', '../DFT_histogram/O_train.csv', 55, (3, 6, 3, 3, 3)))
+
+for adsorbate, csvTrain, nFeatures, zoneSizes in adsorbates:
+
+	# load training set fingerprints and energies
+	XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(nFeatures))
+	ETrain = np.loadtxt(csvTrain, dtype='float', delimiter=',', usecols=-1)
+
+	# random subset of the training set
+	ids = np.random.RandomState(0).permutation(len(ETrain))[:nSmall]
+
+	for name, X, E in (('all', XTrain, ETrain), ('%d'%nSmall, XTrain[ids], ETrain[ids])):
+
+		# parameters and cross-validation errors of all penalties from a single decomposition
+		w, looRMSE, gcvRMSE = model.ridge_path(X, E, 5, zoneSizes, penalties)
+		best = np.argmin(looRMSE)
+		print('%-2s (%3s samples) penalty = %.2e: leave-one-out RMSE = %.3f eV, GCV RMSE = %.3f eV'
+			  ' (unpenalized: %.3f eV, %.3f eV)'
+			  %(adsorbate, name, penalties[best], looRMSE[best], gcvRMSE[best],
+				looRMSE[0], gcvRMSE[0]))
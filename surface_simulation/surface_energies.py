@@ -0,0 +1,87 @@
+'''simulate a large random IrPdPtRhRu(111) surface, predict the *OH adsorption energy of every
+on-top site and the *O adsorption energy of every fcc hollow site, and print the activity of the
+on-top sites together with the activity of the same composition as given by the fingerprint
+polynomial to the terminal. Neighbouring sites share atoms, so the standard error of the activity
+of the simulated surface is estimated from the spread over several independent surfaces'''
+
+import numpy as np
+import sys
+
+# update system path to be able to import the LinearRegression, Surface and Activity classes
+sys.path.append('../model')
+from LinearRegression import LinearRegression
+from Surface import Surface
+from Activity import Activity
+
+# physical constants
+e = 1.602176565e-19 # J/eV
+kB = 1.3806488e-23 # J/K
+
+# absolute temperature (K)
+T = 300
+
+# Boltzmann's constant times temperature (eV)
+kBT = (kB/e)*T
+
+# optimal *OH adsorption energy (eV)
+energyOpt = 1.10
+
+# metals in alloy
+metals = ('Ir', 'Pd', 'Pt', 'Rh', 'Ru')
+
+# number of metals
+nMetals = len(metals)
+
+# molar fractions of the metals
+fractions = (0.2, 0.2, 0.2, 0.2, 0.2)
+
+# number of surface atoms along each lattice vector
+size = (200, 200)
+
+# number of independent random surfaces to estimate the standard error of the activity from
+nSurfaces = 10
+
+# adsorption site, zones and training set of each adsorbate
+adsorbates = {'OH': ('onTop', ('ens', 's', 'ss'), (1, 6, 3), '../DFT_histogram/OH_train.csv', 15),
+			  'O': ('fcc', ('ens', 'sf', 'ssf', 'sn', 'ssn'), (3, 6, 3, 3, 3),
+					'../DFT_histogram/O_train.csv', 55)}
+
+# random surface and subsurface of the alloy
+surface = Surface(fractions, size, seed=0)
+
+weights, energies = {}, {}
+for adsorbate, (site, zones, zoneSizes, csvTrain, nFeatures) in adsorbates.items():
+	model = LinearRegression()
+
+	# load training adsorption energies
+	XTrain = np.loadtxt(csvTrain, dtype='int', delimiter=',', usecols=range(nFeatures))
+	ETrain = np.loadtxt(csvTrain, dtype='float', usecols=-1, delimiter=',')
+
+	# load linear regression parameters of all features cached from the same training set, or
+	# calculate and cache them
+	weights[adsorbate] = model.fit(XTrain, ETrain, nMetals, zoneSizes, metals,
+								   filename='../DFT_histogram/%s_model.json'%adsorbate)
+
+	# predicted adsorption energy of every site of the surface
+	energies[adsorbate] = surface.energies(weights[adsorbate], site, zones)
+
+	print('*%-2s %s sites: %d, mean energy: %.3f eV, standard deviation: %.3f eV'
+		  %(adsorbate, site, energies[adsorbate].size, energies[adsorbate].mean(),
+			energies[adsorbate].std()))
+
+	if adsorbate == 'OH':
+		# activity of the composition as the average over all fingerprints
+		activity = Activity.compile(model.fingerprint_blocks(weights[adsorbate], nMetals,
+															 zoneSizes), energyOpt, kBT)
+
+# activity of the on-top sites of the first and of further independent surfaces
+site, zones = adsorbates['OH'][:2]
+surfaceActivities = [np.mean(np.exp(-np.abs(energies['OH'] - energyOpt) / kBT))]
+for seed in range(1, nSurfaces):
+	siteEnergies = Surface(fractions, size, seed=seed).energies(weights['OH'], site, zones)
+	surfaceActivities.append(np.mean(np.exp(-np.abs(siteEnergies - energyOpt) / kBT)))
+
+print('*OH activity of the simulated surfaces: %.6f +- %.6f (standard error over %d surfaces)'
+	  %(np.mean(surfaceActivities), np.std(surfaceActivities, ddof=1) / np.sqrt(nSurfaces),
+		nSurfaces))
+print('*OH activity of the composition:        %.6f' % activity.activity(fractions))